@@ -0,0 +1,244 @@
+'''
+    Async counterparts of the functions in :mod:`chunked`.
+    They accept async iterables (plain iterables are accepted too) and
+    return async iterators, or a coroutine for the functions that return
+    a single value:
+        async for chunk in async_chunked.chunked(stream, 100):
+            ...
+        head = await async_chunked.first(stream)
+'''
+import asyncio
+from inspect import isawaitable
+from operator import sub
+from time import monotonic
+
+from chunked import _marker, _split_size, raise_
+
+
+async def _from_iterable(iterable):
+    for item in iterable:
+        yield item
+
+
+def _aiter(iterable):
+    if hasattr(iterable, '__aiter__'):
+        return iterable.__aiter__()
+    return _from_iterable(iterable)
+
+
+async def _wait(awaitable, timeout):
+    if hasattr(asyncio, 'timeout'):
+        async with asyncio.timeout(timeout):
+            return await awaitable
+    return await asyncio.wait_for(awaitable, timeout)
+
+
+async def take(iterable, n):
+    it = _aiter(iterable)
+    result = []
+    while n is None or len(result) < n:
+        try:
+            result.append(await it.__anext__())
+        except StopAsyncIteration:
+            break
+    return result
+
+
+async def chunked(iterable, n, strict=False):
+    if strict and n is None:
+        raise ValueError('n cant be none when strict is True')
+    it = _aiter(iterable)
+    while True:
+        chunk = await take(it, n)
+        if not chunk:
+            return
+        if strict and len(chunk) != n:
+            raise ValueError('iterator is not divisible by n')
+        yield chunk
+
+
+async def first(iterable, default=_marker):
+    try:
+        return await _aiter(iterable).__anext__()
+    except StopAsyncIteration as e:
+        if default is _marker:
+            raise ValueError('first() was called on an empty iterable and'
+                             'no default value was provided') from e
+        return default
+
+
+async def last(iterable, default=_marker):
+    item = _marker
+    async for item in _aiter(iterable):
+        pass
+    if item is _marker:
+        if default is _marker:
+            raise ValueError('last() was called on an empty iterable and no default value was provided.')
+        return default
+    return item
+
+
+async def one(iterable, too_short=None, too_lang=None):
+    it = _aiter(iterable)
+    try:
+        first_value = await it.__anext__()
+    except StopAsyncIteration as e:
+        raise (
+                too_short or ValueError('too few items in iterable(expected 1)')
+        ) from e
+    try:
+        second_value = await it.__anext__()
+    except StopAsyncIteration:
+        pass
+    else:
+        msg = ('Expected exactly on item in iterable, but got {!r}, {!r} and perhaps '
+               'more'.format(first_value, second_value))
+        raise too_lang or ValueError(msg)
+    return first_value
+
+
+async def only(iterable, default=None, too_lang=None):
+    it = _aiter(iterable)
+    try:
+        first_value = await it.__anext__()
+    except StopAsyncIteration:
+        return default
+    try:
+        second_value = await it.__anext__()
+    except StopAsyncIteration:
+        pass
+    else:
+        msg = (
+            'Expected exactly one item in iterable, but {}, {} and perhaps more.'
+            .format(first_value, second_value)
+        )
+        raise too_lang or ValueError(msg)
+    return first_value
+
+
+async def strictly_n(iterable, n, too_short=None, too_long=None):
+    if too_short is None:
+        too_short = lambda item_count: raise_(
+            ValueError,
+            f'Too few items in iterable ( got {item_count} )'
+        )
+    if too_long is None:
+        too_long = lambda item_count: raise_(
+            ValueError,
+            f'Too many items in iterable ( at least {item_count})'
+        )
+    it = _aiter(iterable)
+    for i in range(n):
+        try:
+            item = await it.__anext__()
+        except StopAsyncIteration:
+            too_short(i)
+            return
+        else:
+            yield item
+    try:
+        await it.__anext__()
+    except StopAsyncIteration:
+        pass
+    else:
+        too_long(n + 1)
+
+
+async def split_after(iterable, pred, max_split=-1):
+    it = _aiter(iterable)
+    if max_split == 0:
+        yield await take(it, None)
+        return
+
+    buf = []
+    async for item in it:
+        buf.append(item)
+        if pred(item) and buf:
+            yield buf
+            if max_split == 1:
+                yield await take(it, None)
+                return
+            buf = []
+            max_split -= 1
+    if buf:
+        yield buf
+
+
+async def split_into(iterable, sizes):
+    it = _aiter(iterable)
+    for size in sizes:
+        if size is None:
+            yield await take(it, None)
+            return
+        else:
+            yield await take(it, _split_size(size))
+
+
+async def map_if(iterable, pred, func, func_else=lambda x: x):
+    '''
+        Like :func:`chunked.map_if`; *func* and *func_else* may also be
+        coroutine functions, whose results are awaited.
+    '''
+    async for item in _aiter(iterable):
+        result = func(item) if pred(item) else func_else(item)
+        if isawaitable(result):
+            result = await result
+        yield result
+
+
+async def interleave(*iterable):
+    its = [_aiter(it) for it in iterable]
+    if not its:
+        return
+    while True:
+        try:
+            batch = [await it.__anext__() for it in its]
+        except StopAsyncIteration:
+            return
+        for item in batch:
+            yield item
+
+
+async def difference(iterable, func=sub, *, initial=None):
+    it = _aiter(iterable)
+    try:
+        previous = await it.__anext__()
+    except StopAsyncIteration:
+        return
+    if initial is None:
+        yield previous
+    async for item in it:
+        yield func(item, previous)
+        previous = item
+
+
+class time_limited:
+    '''
+        Yield items from *iterable* until *limit_second* seconds have
+        passed. Unlike :class:`chunked.time_limited`, the deadline also
+        applies while waiting on the producer: a pending ``__anext__``
+        is cancelled when the time runs out.
+    '''
+
+    def __init__(self, limit_second, iterable):
+        if limit_second < 0:
+            raise ValueError
+        self._limit_second = limit_second
+        self._iterable = _aiter(iterable)
+        self._start_time = monotonic()
+        self.timed_out = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.timed_out:
+            raise StopAsyncIteration
+        remaining = self._limit_second - (monotonic() - self._start_time)
+        try:
+            if remaining <= 0:
+                raise TimeoutError
+            return await _wait(self._iterable.__anext__(), remaining)
+        except (TimeoutError, asyncio.TimeoutError):
+            self.timed_out = True
+            raise StopAsyncIteration from None
@@ -0,0 +1,263 @@
+'''
+    Benchmarks for every public function in :mod:`chunked`.
+    Each case is timed on several input kinds (list, generator, range,
+    bytes) and sizes, recording items/sec and peak traced memory:
+        python bench_chunked.py --output bench.json
+        python bench_chunked.py --baseline bench.json --threshold 0.2
+    With ``--baseline`` the run is compared against a previous result file
+    and the script exits with status 1 if any case got slower, or used
+    more memory, by more than *threshold* (a fraction).
+'''
+import argparse
+import gc
+import json
+import platform
+import sys
+import tracemalloc
+from collections import deque
+from io import BytesIO
+from itertools import count
+from time import perf_counter
+
+import chunked
+
+KINDS = {
+    'list': lambda size: list(range(size)),
+    'generator': lambda size: (i for i in range(size)),
+    'range': range,
+    'bytes': lambda size: (bytes(range(256)) * (size // 256 + 1))[:size],
+}
+SEQUENCE_KINDS = ('list', 'range', 'bytes')
+SIZES = (10, 1000, 100_000)
+FULL_SIZES = (10, 1000, 100_000, 10_000_000)
+NOT_BENCHMARKED = {'raise_', 'LineIndex', 'register'}
+
+
+def consume(iterator):
+    deque(iterator, maxlen=0)
+
+
+def _one(x):
+    return 1
+
+
+def _is_odd(x):
+    return x & 1
+
+
+def _neg(x):
+    return -x
+
+
+def _upper_chunk(chunk):
+    return bytes(chunk).upper()
+
+
+def _fill_and_drain(buffer, data):
+    for item in data:
+        buffer.append(item)
+    while buffer:
+        buffer.popleft()
+    buffer.close()
+
+
+class Case:
+    def __init__(self, func, kinds=tuple(KINDS), max_size=None):
+        self.func = func
+        self.kinds = kinds
+        self.max_size = max_size
+
+    def applies(self, kind, size):
+        return kind in self.kinds and (self.max_size is None or size <= self.max_size)
+
+
+CASES = {
+    'take': Case(lambda data, size: chunked.take(data, size)),
+    'chunked': Case(lambda data, size: consume(chunked.chunked(data, 64))),
+    'chunked_zero_copy': Case(lambda data, size: consume(chunked.chunked(data, 64, zero_copy=True))),
+    'constrained_batches': Case(
+        lambda data, size: consume(chunked.constrained_batches(data, 4096, max_count=64, get_len=_one))
+    ),
+    'ichunked': Case(lambda data, size: consume(map(consume, chunked.ichunked(data, 64)))),
+    'first': Case(lambda data, size: consume(map(chunked.first, zip(data)))),
+    'last': Case(lambda data, size: chunked.last(data)),
+    'nth_or_last': Case(lambda data, size: chunked.nth_or_last(data, size - 1)),
+    'one': Case(lambda data, size: consume(map(chunked.one, zip(data)))),
+    'interleave': Case(lambda data, size: consume(chunked.interleave(data, count()))),
+    'interleave_longest': Case(lambda data, size: consume(chunked.interleave_longest(data, range(size // 2)))),
+    'roundrobin': Case(
+        lambda data, size: consume(chunked.roundrobin(data, range(size // 2), weights=[4, 1]))
+    ),
+    'repeat_each': Case(lambda data, size: consume(chunked.repeat_each(data))),
+    'irepeat_each': Case(lambda data, size: consume(chunked.irepeat_each(data))),
+    'strictly_n': Case(lambda data, size: consume(chunked.strictly_n(data, size))),
+    'only': Case(lambda data, size: consume(map(chunked.only, zip(data)))),
+    'always_reversible': Case(lambda data, size: consume(chunked.always_reversible(data))),
+    'reversed_lines': Case(lambda data, size: consume(chunked.reversed_lines(BytesIO(data))), kinds=('bytes',)),
+    'always_reversible_budget': Case(
+        lambda data, size: consume(chunked.always_reversible(iter(data), budget=4096))
+    ),
+    'SpillBuffer': Case(lambda data, size: _fill_and_drain(chunked.SpillBuffer(4096), data)),
+    'spill_tee': Case(lambda data, size: consume(map(consume, chunked.spill_tee(data, budget=4096)))),
+    'always_iterable': Case(lambda data, size: consume(chunked.always_iterable(data))),
+    'split_after': Case(lambda data, size: consume(chunked.split_after(data, _is_odd))),
+    'split_after_bytes': Case(
+        lambda data, size: consume(chunked.split_after_bytes(BytesIO(data))), kinds=('bytes',)
+    ),
+    'split_into': Case(lambda data, size: consume(chunked.split_into(data, [size // 3, size // 3, None]))),
+    'isplit_after': Case(lambda data, size: consume(map(consume, chunked.isplit_after(data, _is_odd)))),
+    'isplit_into': Case(
+        lambda data, size: consume(map(consume, chunked.isplit_into(data, [size // 3, size // 3, None])))
+    ),
+    'prefetch': Case(lambda data, size: consume(chunked.prefetch(data, depth=4, chunk_size=256))),
+    'map_if': Case(lambda data, size: consume(chunked.map_if(data, _is_odd, _neg))),
+    'map_if_parallel': Case(
+        lambda data, size: consume(chunked.map_if_parallel(data, _is_odd, _neg, batch_size=1024)),
+        max_size=100_000,
+    ),
+    'map_chunks_shared': Case(
+        lambda data, size: chunked.map_chunks_shared(_upper_chunk, data, 1 << 14, max_workers=2),
+        kinds=('bytes',), max_size=100_000,
+    ),
+    'time_limited': Case(lambda data, size: consume(chunked.time_limited(3600, iter(data)))),
+    'time_limited_auto': Case(
+        lambda data, size: consume(chunked.time_limited(3600, iter(data), check_every='auto'))
+    ),
+    'time_limited_preemptive': Case(
+        lambda data, size: consume(chunked.time_limited(3600, data, preemptive=True)),
+        max_size=100_000,
+    ),
+    'difference': Case(lambda data, size: consume(chunked.difference(data))),
+    'difference_chunks': Case(lambda data, size: consume(chunked.difference_chunks(chunked.chunked(data, 4096)))),
+    'accumulate_chunks': Case(lambda data, size: consume(chunked.accumulate_chunks(chunked.chunked(data, 4096)))),
+    'windowed': Case(lambda data, size: consume(chunked.windowed(data, 64, step=8))),
+    'rolling_sum': Case(lambda data, size: consume(chunked.rolling_sum(data, 64))),
+    'rolling_mean': Case(lambda data, size: consume(chunked.rolling_mean(data, 64))),
+    'rolling_min': Case(lambda data, size: consume(chunked.rolling_min(data, 64))),
+    'rolling_max': Case(lambda data, size: consume(chunked.rolling_max(data, 64))),
+    'rolling_chunks': Case(lambda data, size: consume(chunked.rolling_chunks(chunked.chunked(data, 4096), 64))),
+    'collapse': Case(lambda data, size: consume(chunked.collapse([data, [list(data)], [[1, 'a'], (2,)]]))),
+    'value_chain': Case(lambda data, size: consume(chunked.value_chain(data))),
+    'seekable': Case(lambda data, size: consume(chunked.seekable(data, maxlen=1024))),
+    'SequenceView': Case(lambda data, size: consume(chunked.SequenceView(data)), kinds=SEQUENCE_KINDS),
+    'SequenceView_window': Case(
+        lambda data, size: consume(chunked.SequenceView(data)[1:][::2][::-1]), kinds=SEQUENCE_KINDS
+    ),
+}
+
+
+def public_functions():
+    return sorted(
+        name for name, obj in vars(chunked).items()
+        if not name.startswith('_') and callable(obj)
+        and getattr(obj, '__module__', None) == chunked.__name__
+        and name not in NOT_BENCHMARKED
+    )
+
+
+def measure(case, kind, size, repeat):
+    best = None
+    for _ in range(repeat):
+        data = KINDS[kind](size)
+        gc.collect()
+        start = perf_counter()
+        case.func(data, size)
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    data = KINDS[kind](size)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        case.func(data, size)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'seconds': best,
+        'items_per_sec': size / best if best else float('inf'),
+        'peak_bytes': peak,
+    }
+
+
+def run(names, kinds, sizes, repeat, log=None):
+    results = {}
+    for name in names:
+        case = CASES[name]
+        for kind in kinds:
+            for size in sizes:
+                if not case.applies(kind, size):
+                    continue
+                key = f'{name}/{kind}/{size}'
+                results[key] = measure(case, kind, size, repeat)
+                if log is not None:
+                    log(f"{key:45} {results[key]['items_per_sec']:>16,.0f} items/s "
+                        f"{results[key]['peak_bytes']:>12,} B peak")
+    return results
+
+
+def compare(results, baseline, threshold):
+    '''
+        Return a list of ``(key, metric, baseline, current)`` for every
+        case that is slower, or uses more memory, than *baseline* by more
+        than *threshold*.
+    '''
+    regressions = []
+    for key, current in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        if current['items_per_sec'] < before['items_per_sec'] * (1 - threshold):
+            regressions.append((key, 'items_per_sec', before['items_per_sec'], current['items_per_sec']))
+        if current['peak_bytes'] > before['peak_bytes'] * (1 + threshold) + 1024:
+            regressions.append((key, 'peak_bytes', before['peak_bytes'], current['peak_bytes']))
+    return regressions
+
+
+def _csv(value):
+    return [item for item in value.split(',') if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', type=_csv, help='comma separated case names')
+    parser.add_argument('--kinds', type=_csv, default=list(KINDS), help='comma separated input kinds')
+    parser.add_argument('--sizes', type=lambda v: [int(float(s)) for s in _csv(v)], help='comma separated sizes')
+    parser.add_argument('--full', action='store_true', help=f'use sizes {FULL_SIZES}')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case, the best is kept')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='JSON file from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed regression as a fraction')
+    args = parser.parse_args(argv)
+
+    missing = set(public_functions()) - set(CASES)
+    if missing:
+        print(f"no benchmark for: {', '.join(sorted(missing))}", file=sys.stderr)
+    names = args.only or list(CASES)
+    unknown = set(names) - set(CASES) | set(args.kinds) - set(KINDS)
+    if unknown:
+        parser.error(f"unknown case or kind: {', '.join(sorted(unknown))}")
+    sizes = args.sizes or (FULL_SIZES if args.full else SIZES)
+
+    results = run(names, args.kinds, sizes, args.repeat, log=print)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for key, metric, before, after in regressions:
+            print(f'REGRESSION {key} {metric}: {before:,.0f} -> {after:,.0f}', file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
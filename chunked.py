@@ -1,9 +1,26 @@
-from functools import partial
-from itertools import islice, chain, repeat, tee, starmap
-from collections.abc import Sequence
+import os
+import sys
+from abc import get_cache_token
+from bisect import bisect_right
+from functools import partial, singledispatch
+from io import IOBase, TextIOBase, SEEK_END
+from mmap import mmap
+from array import array
+from itertools import islice, chain, repeat, accumulate
+from collections.abc import Reversible, Sequence, Sized
 from collections import deque
+from os import cpu_count
+from queue import Queue, Empty, Full
+from threading import Thread, Event
+from zlib import crc32
+from types import GeneratorType
 from time import monotonic
-from operator import sub
+from struct import Struct, calcsize, error as StructError
+from operator import index, indexOf, countOf, sub, add, mul, truediv, floordiv, mod, pow, lt, gt
+
+# numpy is optional and never imported here, as it is slow to import: an
+# ndarray can only exist once the caller has imported numpy. See _numpy().
+np = None
 
 l = [0, 1, 2, 3, 4, 5, 6, 7]
 s = ['a', 'b', 'c', 'd']
@@ -19,7 +36,135 @@ def take(iterable, n):
     return list(islice(iterable, n))
 
 
-def chunked(iterable, n, strict=False):
+def _sliced(seq, n, strict):
+    size = len(seq)
+    if n is None:
+        n = size
+    if not n:
+        return
+    for start in range(0, size, n):
+        chunk = seq[start:start + n]
+        if strict and len(chunk) != n:
+            raise ValueError('iterator is not divisible by n')
+        yield chunk
+
+
+def _is_stop(n):
+    # What islice() accepts as a count. The sequence fast paths leave anything
+    # else to the generic versions so it fails with the same error.
+    try:
+        return index(n) >= 0
+    except TypeError:
+        return False
+
+
+def _as_view(iterable):
+    try:
+        view = memoryview(iterable)
+    except TypeError:
+        return None
+    return view if view.ndim == 1 else None
+
+
+def _numpy():
+    global np
+    if np is None:
+        np = sys.modules.get('numpy')
+        if np is not None:
+            _register_numpy()
+    return np
+
+
+def _is_ndarray(obj):
+    return _numpy() is not None and isinstance(obj, np.ndarray)
+
+
+def _np_chunked(arr, n, strict, zero_copy=False):
+    size = len(arr)
+    if n is None:
+        n = size
+    if not n:
+        return
+    full = size - size % n
+    yield from arr[:full].reshape(-1, n, *arr.shape[1:])
+    if full != size:
+        if strict:
+            raise ValueError('iterator is not divisible by n')
+        yield arr[full:]
+
+
+def _split_size(size):
+    try:
+        size = index(size)
+    except TypeError:
+        raise ValueError(f'invalid size {size!r}') from None
+    if size < 0:
+        raise ValueError(f'invalid size {size!r}')
+    return size
+
+
+def _np_split_into(arr, sizes):
+    start = 0
+    for size in sizes:
+        if size is None:
+            yield arr[start:]
+            return
+        size = _split_size(size)
+        yield arr[start:start + size]
+        start += size
+
+
+def _np_ufunc(func):
+    if isinstance(func, np.ufunc):
+        return func
+    return {
+        sub: np.subtract, add: np.add, mul: np.multiply, truediv: np.true_divide,
+        floordiv: np.floor_divide, mod: np.mod, pow: np.power,
+    }.get(func)
+
+
+def _np_difference(arr, ufunc, initial):
+    if ufunc is np.subtract:
+        diff = np.diff(arr, axis=0)
+    else:
+        diff = ufunc(arr[1:], arr[:-1])
+    if initial is not None:
+        return diff
+    return np.concatenate((arr[:1], diff))
+
+
+def _np_rolling_sum(arr, n):
+    # Narrow floats would lose the window's digits against the running total.
+    totals = np.cumsum(arr, dtype=np.result_type(arr, np.float64) if arr.dtype.kind == 'f' else None)
+    totals = np.concatenate((np.zeros(1, totals.dtype), totals))
+    return totals[n:] - totals[:-n]
+
+
+def _np_rolling_mean(arr, n):
+    return _np_rolling_sum(arr, n) / n
+
+
+def _np_rolling_extreme(arr, n, ufunc):
+    # van Herk/Gil-Werman: split into blocks of n, then each window is
+    # the suffix of one block combined with the prefix of the next.
+    size = len(arr)
+    if size < n:
+        return arr[:0]
+    blocks = np.concatenate((arr, np.repeat(arr[-1:], -size % n))).reshape(-1, n)
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return ufunc(suffix[:size - n + 1], prefix[n - 1:size])
+
+
+def _np_rolling_min(arr, n):
+    return _np_rolling_extreme(arr, n, np.minimum)
+
+
+def _np_rolling_max(arr, n):
+    return _np_rolling_extreme(arr, n, np.maximum)
+
+
+def chunked(iterable, n, strict=False, zero_copy=False, prefetch=None):
     '''
         Break iterable into of length 'n'
             list(chunked([1,2,3,4,5,6], 3))
@@ -32,12 +177,39 @@ def chunked(iterable, n, strict=False):
         If the length of *iterable* is not divisible by *n* and *strict* is
         ``True``, then ``ValueError`` will be raised before the last
         list is yielded.
+        If *zero_copy* is ``True``, buffer-protocol inputs (``bytes``,
+        ``bytearray``, ``array.array``, ``mmap``) are split into
+        ``memoryview`` windows and other sequences into slices, instead
+        of being copied item by item:
+            [bytes(c) for c in chunked(b'abcde', 2, zero_copy=True)]
+            [b'ab', b'cd', b'e']
+        The windows share memory with *iterable*, so a resizable or
+        closable source (``bytearray``, ``mmap``) can't be resized or
+        closed while they are alive. Other iterables use the default path.
+        When NumPy is installed, an ``ndarray`` is split into array views
+        rather than lists of NumPy scalars.
+        With *prefetch*, chunks are built on a background thread that
+        stays up to *prefetch* chunks ahead (see :func:`prefetch`).
     '''
+    if strict and n is None:
+        raise ValueError('n cant be none when strict is True')
+    impl = _DISPATCH['chunked'][iterable.__class__]
+    if prefetch is not None:
+        _check_prefetch(prefetch, 1)
+        return _prefetch(impl(iterable, n, strict, zero_copy), prefetch, 1)
+    return impl(iterable, n, strict, zero_copy)
+
+
+def _chunked(iterable, n, strict, zero_copy):
+    if zero_copy and (n is None or _is_stop(n)):
+        view = _as_view(iterable)
+        if view is not None:
+            return _sliced(view, n, strict)
+        if isinstance(iterable, Sequence):
+            return _sliced(iterable, n, strict)
+
     iterator = iter(partial(take, iter(iterable), n), [])
     if strict:
-        if n is None:
-            raise ValueError('n cant be none when strict is True')
-
         def ret():
             for chunk in iterator:
                 if len(chunk) != n:
@@ -49,6 +221,84 @@ def chunked(iterable, n, strict=False):
         return iterator
 
 
+class _LazyChunk:
+    def __init__(self, iterator):
+        self._iterator = iterator
+        self._cache = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._cache:
+            return self._cache.popleft()
+        return next(self._iterator)
+
+    def _fill_cache(self):
+        self._cache.extend(self._iterator)
+
+
+def ichunked(iterable, n):
+    '''
+        Like :func:`chunked`, but each chunk is an iterator that pulls from
+        *iterable* as it is consumed instead of a list:
+            [list(chunk) for chunk in ichunked(range(7), 3)]
+            [[0, 1, 2], [3, 4, 5], [6]]
+        Chunks come out in order. Moving on to the next chunk before the
+        current one is exhausted buffers the rest of the current one.
+    '''
+    if n is not None and n < 1:
+        raise ValueError('n must be at least 1')
+    return _ichunked(iter(iterable), n)
+
+
+def _ichunked(it, n):
+    while True:
+        for item in it:
+            break
+        else:
+            return
+        chunk = _LazyChunk(chain((item,), islice(it, None if n is None else n - 1)))
+        yield chunk
+        chunk._fill_cache()
+
+
+def constrained_batches(iterable, max_size, max_count=None, get_len=len, strict=True):
+    '''
+        Break *iterable* into lists whose total size, measured with
+        *get_len*, is at most *max_size*, and that hold at most *max_count*
+        items if it is given. A batch is yielded as soon as the next item
+        would exceed either limit:
+            list(constrained_batches([b'12345', b'123', b'12345678', b'1', b'1'], 10, max_count=2))
+            [[b'12345', b'123'], [b'12345678', b'1'], [b'1']]
+        An item larger than *max_size* raises ``ValueError`` if *strict* is
+        ``True``, and is otherwise yielded in a batch of its own. Each item
+        is measured once.
+    '''
+    if max_size <= 0:
+        raise ValueError('max_size must be greater than zero')
+    if max_count is not None and max_count < 1:
+        raise ValueError('max_count must be at least 1')
+    return _constrained_batches(iterable, max_size, max_count, get_len, strict)
+
+
+def _constrained_batches(iterable, max_size, max_count, get_len, strict):
+    batch = []
+    batch_size = 0
+    for item in iterable:
+        item_size = get_len(item)
+        if strict and item_size > max_size:
+            raise ValueError('item size exceeds max_size')
+        if batch and (batch_size + item_size > max_size or len(batch) == max_count):
+            yield batch
+            batch = []
+            batch_size = 0
+        batch.append(item)
+        batch_size += item_size
+    if batch:
+        yield batch
+
+
 # print(list(chunked(l, 3)))
 
 def first(iterable, default=_marker):
@@ -64,7 +314,12 @@ def first(iterable, default=_marker):
         :func:`first` is useful when you have a generator of expensive-to-retrieve
         values and want any arbitrary one. It is marginally shorter than
         ``next(iter(iterable), default)``.
+        A :class:`seekable` is left at the position it was in.
         """
+    return _DISPATCH['first'][iterable.__class__](iterable, default)
+
+
+def _first(iterable, default=_marker):
     try:
         return next(iter(iterable))
     except StopIteration as e:
@@ -76,24 +331,82 @@ def first(iterable, default=_marker):
 
 
 def last(iterable, default=_marker):
+    return _DISPATCH['last'][iterable.__class__](iterable, default)
+
+
+def _no_last(default):
+    if default is _marker:
+        raise ValueError('last() was called on an empty iterable and no default value was provided.')
+    return default
+
+
+def _last(iterable, default=_marker):
     try:
-        if isinstance(iterable, Sequence):
-            return iterable[-1]
-        elif hasattr(iterable, '__reversed__'):
-            return next(reversed(iterable))
-        else:
-            return deque(iterable, maxlen=1)[-1]
-    except (IndexError, TypeError, StopIteration):
-        if default is _marker:
-            raise ValueError('last() was called on an empty iterable and no default value was provided.')
-        return default
+        return deque(iterable, maxlen=1)[-1]
+    except (IndexError, TypeError):
+        return _no_last(default)
+
+
+def _last_sequence(sequence, default=_marker):
+    try:
+        return sequence[-1]
+    except (IndexError, TypeError):
+        return _no_last(default)
+
+
+def _last_reversible(iterable, default=_marker):
+    try:
+        return next(reversed(iterable))
+    except (TypeError, StopIteration):
+        return _no_last(default)
+
+
+def _last_file(file, default=_marker):
+    if _reverse_source(file) is None:
+        return _last(file, default)
+    indexed = _indexed_file(file)
+    if indexed is not None and indexed[1] < len(indexed[0]):
+        file.seek(indexed[0].offset(-1))
+        return file.readline()
+    lines = reversed_lines(file)
+    try:
+        return next(lines)
+    except StopIteration:
+        return _no_last(default)
+    finally:
+        lines.close()
 
 
 def nth_or_last(iterable, n, default=_marker):
+    return _DISPATCH['nth_or_last'][iterable.__class__](iterable, n, default)
+
+
+def _nth_or_last(iterable, n, default=_marker):
     return last(islice(iterable, n + 1), default=default)
 
 
+def _nth_or_last_file(file, n, default=_marker):
+    indexed = _indexed_file(file) if n >= 0 else None
+    if indexed is not None:
+        index, start = indexed
+        if start < len(index):
+            file.seek(index.offset(min(start + n, len(index) - 1)))
+            return file.readline()
+        return _nth_or_last((), n, default)
+    return _nth_or_last(file, n, default)
+
+
+def _nth_or_last_sequence(sequence, n, default=_marker):
+    if _is_stop(n) and len(sequence):
+        return sequence[min(n, len(sequence) - 1)]
+    return _nth_or_last(sequence, n, default)
+
+
 def one(iterable, too_short=None, too_lang=None):
+    return _DISPATCH['one'][iterable.__class__](iterable, too_short, too_lang)
+
+
+def _one(iterable, too_short=None, too_lang=None):
     it = iter(iterable)
     try:
         first_value = next(it)
@@ -116,11 +429,74 @@ def interleave(*iterable):
     return chain.from_iterable(zip(*iterable))
 
 
+def interleave_longest(*iterables):
+    '''
+        Like :func:`interleave`, but keep going until every iterable is
+        exhausted, skipping the ones that have run out:
+            list(interleave_longest([1, 2, 3], [4, 5], [6, 7, 8]))
+            [1, 4, 6, 2, 5, 7, 3, 8]
+    '''
+    return roundrobin(*iterables)
+
+
+def roundrobin(*iterables, weights=None):
+    '''
+        Take items from each iterable in turn, dropping each one as soon as
+        it is exhausted. The live iterators are kept in a ``deque`` that is
+        rotated, so a round costs O(1) per live source no matter how many
+        have finished. With *weights*, iterable ``i`` contributes up to
+        ``weights[i]`` items per turn:
+            list(roundrobin('ABC', 'de', weights=[2, 1]))
+            ['A', 'B', 'd', 'C', 'e']
+    '''
+    if weights is None:
+        return _roundrobin(iterables)
+    weights = list(weights)
+    if len(weights) != len(iterables):
+        raise ValueError('weights must have one entry per iterable')
+    if any(not isinstance(weight, int) or weight < 1 for weight in weights):
+        raise ValueError('weights must be positive integers')
+    return _weighted_roundrobin(iterables, weights)
+
+
+def _roundrobin(iterables):
+    nexts = deque(iter(it).__next__ for it in iterables)
+    while nexts:
+        try:
+            while True:
+                yield nexts[0]()
+                nexts.rotate(-1)
+        except StopIteration:
+            nexts.popleft()
+
+
+def _weighted_roundrobin(iterables, weights):
+    sources = deque((iter(it), weight) for it, weight in zip(iterables, weights))
+    while sources:
+        it, weight = sources[0]
+        taken = 0
+        for taken, item in enumerate(islice(it, weight), 1):
+            yield item
+        if taken < weight:
+            sources.popleft()
+        else:
+            sources.rotate(-1)
+
+
 def repeat_each(iterable, n=2):
     return list(chain.from_iterable(map(repeat, iterable, repeat(n))))
 
 
+def irepeat_each(iterable, n=2):
+    '''Like :func:`repeat_each`, but return an iterator instead of a list.'''
+    return chain.from_iterable(map(repeat, iterable, repeat(n)))
+
+
 def strictly_n(iterable, n, too_short=None, too_long=None):
+    return _DISPATCH['strictly_n'][iterable.__class__](iterable, n, too_short, too_long)
+
+
+def _strictly_n(iterable, n, too_short, too_long):
     if too_short is None:
         too_short = lambda item_count: raise_(
             ValueError,
@@ -149,6 +525,10 @@ def strictly_n(iterable, n, too_short=None, too_long=None):
 
 
 def only(iterable, default=None, too_lang=None):
+    return _DISPATCH['only'][iterable.__class__](iterable, default, too_lang)
+
+
+def _only(iterable, default=None, too_lang=None):
     it = iter(iterable)
     first_value = next(it, default)
 
@@ -165,13 +545,336 @@ def only(iterable, default=None, too_lang=None):
     return first_value
 
 
-def always_reversible(iterable):
+def always_reversible(iterable, budget=None):
+    '''
+        Return ``reversed(iterable)`` when that works, the lines of a
+        seekable file from the last one back, and otherwise the reverse of
+        the items read into a list. With *budget*, an iterable that has to
+        be read first is pickled to a temporary file in batches of
+        *budget* items and read back one batch at a time, so at most
+        *budget* items are held in memory.
+    '''
+    if budget is not None and budget < 1:
+        raise ValueError('budget must be at least 1')
     try:
         return reversed(iterable)
     except TypeError:
+        if _reverse_source(iterable) is not None:
+            return reversed_lines(iterable)
+        if budget is not None:
+            return _spilled_reversed(iter(iterable), budget)
         return reversed(list(iterable))
 
 
+_BLOCK_SIZE = 1 << 16
+
+
+def _reverse_source(obj):
+    if isinstance(obj, mmap):
+        return obj, obj.tell(), None
+    if not isinstance(obj, IOBase) or obj.closed:
+        return None
+    try:
+        if not (obj.seekable() and obj.readable()):
+            return None
+        if isinstance(obj, TextIOBase):
+            raw = getattr(obj, 'buffer', None)
+            if raw is None or '\n'.encode(obj.encoding) != b'\n':
+                return None
+            start = obj.tell()
+            # Higher bits hold decoder state: the position isn't a byte offset.
+            if start >> 64:
+                return None
+            return raw, start, obj
+        return obj, obj.tell(), None
+    except (OSError, ValueError, LookupError):
+        return None
+
+
+def reversed_lines(file, block_size=_BLOCK_SIZE):
+    '''
+        Yield the lines of *file* from the last one back to the current
+        position, reading backwards in blocks of *block_size* bytes, so
+        memory use is bounded by the block size and the longest line.
+        *file* is a seekable binary or text file object, or an ``mmap``.
+        Lines keep their ``'\n'`` ending as with forward iteration;
+        text files must use an ASCII-compatible encoding and their lines
+        are decoded one at a time. ``'\r\n'`` endings come out as the
+        file's *newline* mode gives them; if the file has a bare ``'\r'``,
+        which universal newlines mode also treats as a line break, the
+        lines before it are read forwards instead. Text files opened with
+        ``newline='\r'`` or ``'\r\n'`` are not supported. When iteration
+        ends the file is left at its end, as if it had been read forwards.
+    '''
+    source = _reverse_source(file)
+    if source is None:
+        raise TypeError(f'{file!r} is not a seekable file or mmap')
+    raw, start, text = source
+    if text is None:
+        return _reversed_lines(raw, start, block_size)
+    end = raw.seek(0, SEEK_END)
+    return _reversed_text_lines(_reversed_lines(raw, start, block_size), text, start, end)
+
+
+def _reversed_text_lines(lines, text, start, end):
+    encoding, errors = text.encoding, text.errors
+    # Whether the file keeps '\r\n' endings, read from the first one found.
+    keep_crlf = None
+    count = 0
+    try:
+        for line in lines:
+            crs = line.count(b'\r')
+            if crs and (crs > 1 or not line.endswith(b'\r\n')):
+                break
+            if crs and keep_crlf is None:
+                text.seek(end - len(line))
+                keep_crlf = text.readline().endswith('\r\n')
+            end -= len(line)
+            line = line.decode(encoding, errors)
+            yield line if keep_crlf or not crs else line[:-2] + '\n'
+            count += 1
+        else:
+            return
+        lines.close()
+        text.seek(start)
+        rest = text.readlines()
+        yield from reversed(rest[:len(rest) - count])
+    finally:
+        lines.close()
+        text.seek(0, SEEK_END)
+
+
+def _reversed_lines(raw, start, block_size):
+    if isinstance(raw, mmap):
+        end = len(raw)
+
+        def read_at(pos, size):
+            return raw[pos:pos + size]
+    else:
+        end = raw.seek(0, SEEK_END)
+
+        def read_at(pos, size):
+            raw.seek(pos)
+            return raw.read(size)
+
+    try:
+        # The end of the line being read, as blocks nearest the end first;
+        # they are joined once its start is found so long lines stay linear.
+        parts = []
+        pos = end
+        while pos > start:
+            size = min(block_size, pos - start)
+            pos -= size
+            block = read_at(pos, size)
+            stop = len(block)
+            i = block.rfind(b'\n', 0, stop if parts else stop - 1)
+            while i >= 0:
+                if parts:
+                    parts.append(block[i + 1:stop])
+                    parts.reverse()
+                    yield b''.join(parts)
+                    parts = []
+                else:
+                    yield block[i + 1:stop]
+                stop = i + 1
+                i = block.rfind(b'\n', 0, stop - 1)
+            parts.append(block[:stop])
+        parts.reverse()
+        line = b''.join(parts)
+        if line:
+            yield line
+    finally:
+        raw.seek(end)
+
+
+class LineIndex:
+    '''
+        Byte offsets of the line starts of the file at *path*, kept in a
+        compact ``array`` and saved next to the file in a sidecar
+        (*path* + ``LineIndex.SUFFIX``):
+            LineIndex.open('app.log')
+        Once a file has a sidecar, :func:`nth_or_last`, :func:`last` and
+        :func:`split_into` seek straight to the lines they need when given
+        that file opened in binary mode (or in text mode with an
+        ASCII-compatible encoding). The index records the file's device,
+        inode and modification time and a checksum of the last bytes it
+        covers. When only bytes were appended since, just those are
+        scanned; a file that was replaced, truncated or rewritten is
+        indexed again from the start.
+    '''
+    SUFFIX = '.lineidx'
+    _MAGIC = b'LIDX2\n'
+    # size, line count, st_mtime_ns, st_dev, st_ino, crc32 of the tail
+    _HEADER = Struct('<QQqQQI')
+    _TAIL = 4096
+    _cache = {}
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self._offsets = array('I', [0])
+        self._size = 0
+        self._stat = None
+        self._tail = 0
+
+    @classmethod
+    def open(cls, path, save=True):
+        '''Load the index of *path*, building or updating it if needed.'''
+        index = cls.load(path) or cls(path)
+        if index.update() and save:
+            index.save()
+        return index
+
+    @classmethod
+    def load(cls, path):
+        '''Read the sidecar of *path*, or return ``None`` if there isn't a valid one.'''
+        index = cls(path)
+        try:
+            with open(index.path + cls.SUFFIX, 'rb') as f:
+                if f.read(len(cls._MAGIC)) != cls._MAGIC:
+                    return None
+                size, count, mtime_ns, dev, ino, tail = cls._HEADER.unpack(f.read(cls._HEADER.size))
+                index._offsets = array(cls._typecode(size))
+                index._offsets.fromfile(f, count)
+        except (OSError, EOFError, StructError):
+            return None
+        if sys.byteorder == 'big':
+            index._offsets.byteswap()
+        index._size = size
+        index._stat = (dev, ino, mtime_ns)
+        index._tail = tail
+        return index
+
+    @classmethod
+    def for_file(cls, file):
+        '''
+            Return the up-to-date index of the open *file*, or ``None`` if it
+            has no sidecar. Loaded indexes are cached by path.
+        '''
+        path = getattr(file, 'name', None)
+        if not isinstance(path, str):
+            return None
+        index = cls._cache.get(path)
+        if index is None:
+            if not os.path.exists(path + cls.SUFFIX):
+                return None
+            index = cls._cache[path] = cls.load(path)
+            if index is None:
+                del cls._cache[path]
+                return None
+        if index.update():
+            try:
+                index.save()
+            except OSError:
+                # Reading must not fail because the sidecar can't be written.
+                pass
+        return index
+
+    @staticmethod
+    def _typecode(size):
+        return 'I' if size < 1 << 32 else 'Q'
+
+    def _tail_crc(self, f, size):
+        start = max(size - self._TAIL, 0)
+        f.seek(start)
+        return crc32(f.read(size - start))
+
+    def update(self, block_size=1 << 20):
+        '''
+            Bring the index up to date with the file; return whether anything
+            changed. Only appended bytes are scanned if the file is the same
+            one and the bytes indexed so far still end the same way.
+        '''
+        st = os.stat(self.path)
+        size = st.st_size
+        with open(self.path, 'rb') as f:
+            same = (
+                self._stat is not None and self._stat[:2] == (st.st_dev, st.st_ino)
+                and size >= self._size and self._tail_crc(f, self._size) == self._tail
+            )
+            if size == self._size:
+                if same and self._stat[2] == st.st_mtime_ns:
+                    return False
+                same = False
+            if not same:
+                self._offsets = array('I', [0])
+                self._size = 0
+            if self._offsets.typecode != self._typecode(size):
+                self._offsets = array(self._typecode(size), self._offsets)
+            f.seek(self._size)
+            pos = self._size
+            while pos < size:
+                block = f.read(min(block_size, size - pos))
+                if not block:
+                    break
+                lengths = map((1).__add__, map(len, block.split(b'\n')[:-1]))
+                self._offsets.extend(islice(accumulate(lengths, initial=pos), 1, None))
+                pos += len(block)
+            self._tail = self._tail_crc(f, pos)
+        self._size = pos
+        self._stat = (st.st_dev, st.st_ino, st.st_mtime_ns)
+        return True
+
+    def save(self):
+        offsets = self._offsets
+        if sys.byteorder == 'big':
+            offsets = array(offsets.typecode, offsets)
+            offsets.byteswap()
+        tmp = f'{self.path}{self.SUFFIX}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(self._MAGIC)
+            dev, ino, mtime_ns = self._stat or (0, 0, 0)
+            f.write(self._HEADER.pack(self._size, len(offsets), mtime_ns, dev, ino, self._tail))
+            offsets.tofile(f)
+        os.replace(tmp, self.path + self.SUFFIX)
+
+    def __len__(self):
+        if self._offsets[-1] == self._size:
+            return len(self._offsets) - 1
+        return len(self._offsets)
+
+    def offset(self, line):
+        '''Return the byte offset where *line* starts.'''
+        if not -len(self) <= line < len(self):
+            raise IndexError('line index out of range')
+        return self._offsets[line % len(self)]
+
+    def end(self, line):
+        '''Return the byte offset just past *line*, or past the last line if *line* is beyond it.'''
+        if line + 1 < len(self._offsets):
+            return self._offsets[line + 1]
+        return self._size
+
+    def line_at(self, offset):
+        '''Return the number of the line that starts at *offset*, or ``None``.'''
+        line = bisect_right(self._offsets, offset) - 1
+        if line < 0 or self._offsets[line] != offset:
+            return None
+        return line
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.path!r}, lines={len(self)})'
+
+
+def _indexed_file(obj):
+    if not isinstance(obj, IOBase) or _reverse_source(obj) is None:
+        return None
+    index = LineIndex.for_file(obj)
+    if index is None:
+        return None
+    line = index.line_at(obj.tell())
+    if line is None:
+        return None
+    return index, line
+
+
+def _split_lines(data):
+    parts = data.split(b'\n')
+    lines = [part + b'\n' for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return lines
+
+
 def always_iterable(obj, base_type=(str, bytes)):
     if obj is None:
         return iter(())
@@ -203,7 +906,121 @@ def split_after(iterable, pred, max_split=-1):
         yield buf
 
 
-def split_into(iterable, sizes):
+def _read_into(file):
+    readinto = getattr(file, 'readinto', None)
+    if readinto is not None:
+        return readinto
+
+    def read_into(view):
+        data = file.read(len(view))
+        view[:len(data)] = data
+        return len(data)
+
+    return read_into
+
+
+def split_after_bytes(file, delimiter=b'\n', max_split=-1, buffer_size=1 << 16, copy=True):
+    '''
+        The binary counterpart of :func:`split_after` for a file-like
+        object: yield the records of *file* that end with *delimiter*
+        (the delimiter is kept), plus whatever follows the last one.
+            list(split_after_bytes(BytesIO(b'a,b,c'), b','))
+            [b'a,', b'b,', b'c']
+        The file is read with ``readinto`` into a reused buffer of
+        *buffer_size* bytes (grown only for records that don't fit) and
+        records are found with ``bytearray.find``. With *copy* ``False``
+        records are ``memoryview`` slices of that buffer, which are only
+        valid until the next record is requested. *max_split* works as in
+        :func:`split_after`.
+    '''
+    if not delimiter:
+        raise ValueError('delimiter must not be empty')
+    if max_split == 0:
+        yield file.read()
+        return
+
+    read_into = _read_into(file)
+    width = len(delimiter)
+    buf = bytearray(max(buffer_size, width))
+    view = memoryview(buf)
+    start = end = search = 0
+    while True:
+        i = buf.find(delimiter, search, end)
+        if i >= 0:
+            stop = i + width
+            yield bytes(view[start:stop]) if copy else view[start:stop]
+            start = search = stop
+            if max_split == 1:
+                yield bytes(view[start:end]) + file.read()
+                return
+            max_split -= 1
+            continue
+
+        search = max(start, end - width + 1)
+        if end == len(buf):
+            tail = end - start
+            if start == 0:
+                buf = bytearray(2 * len(buf))
+                buf[:tail] = view[:tail]
+                view = memoryview(buf)
+            else:
+                buf[:tail] = buf[start:end]
+            search -= start
+            start, end = 0, tail
+        elif start == end:
+            start = end = search = 0
+
+        n = read_into(view[end:])
+        if not n:
+            if start < end:
+                yield bytes(view[start:end]) if copy else view[start:end]
+            return
+        end += n
+
+
+def split_into(iterable, sizes, prefetch=None):
+    impl = _DISPATCH['split_into'][iterable.__class__]
+    if prefetch is not None:
+        _check_prefetch(prefetch, 1)
+        return _prefetch(impl(iterable, sizes), prefetch, 1)
+    return impl(iterable, sizes)
+
+
+def _split_into_file(file, sizes):
+    if not isinstance(file, TextIOBase):
+        indexed = _indexed_file(file)
+        if indexed is not None:
+            return _indexed_split_into(file, sizes, *indexed)
+    return _split_into(file, sizes)
+
+
+def _split_into_sequence(sequence, sizes):
+    start = 0
+    sizes = iter(sizes)
+    for size in sizes:
+        if size is not None and not _is_stop(size):
+            yield from _split_into(islice(sequence, start, None), chain((size,), sizes))
+            return
+        chunk = sequence[start:] if size is None else sequence[start:start + size]
+        yield chunk if chunk.__class__ is list else list(chunk)
+        if size is None:
+            return
+        start += len(chunk)
+
+
+def _indexed_split_into(file, sizes, index, line):
+    for size in sizes:
+        file.seek(index.offset(line) if line < len(index) else index.end(len(index)))
+        if size is None:
+            yield _split_lines(file.read())
+            return
+        size = _split_size(size)
+        stop = min(line + size, len(index))
+        yield _split_lines(file.read(index.end(stop - 1) - file.tell())) if stop > line else []
+        line = max(stop, line)
+
+
+def _split_into(iterable, sizes):
     it = iter(iterable)
     for size in sizes:
         if size is None:
@@ -213,46 +1030,1060 @@ def split_into(iterable, sizes):
             yield list(islice(it, size))
 
 
+def isplit_into(iterable, sizes):
+    '''
+        Like :func:`split_into`, but yield iterators that pull from
+        *iterable* on demand, buffering a group only when the next one is
+        requested before it has been fully read.
+    '''
+    it = iter(iterable)
+    for size in sizes:
+        if size is None:
+            yield _LazyChunk(it)
+            return
+        chunk = _LazyChunk(islice(it, _split_size(size)))
+        yield chunk
+        chunk._fill_cache()
+
+
+def _take_through(item, it, pred, split):
+    yield item
+    if pred(item):
+        split.append(True)
+        return
+    for item in it:
+        yield item
+        if pred(item):
+            split.append(True)
+            return
+
+
+def isplit_after(iterable, pred, max_split=-1):
+    '''
+        Like :func:`split_after`, but yield iterators that pull from
+        *iterable* on demand, buffering a group only when the next one is
+        requested before it has been fully read.
+    '''
+    it = iter(iterable)
+    if max_split == 0:
+        yield _LazyChunk(it)
+        return
+    while True:
+        for item in it:
+            break
+        else:
+            return
+        split = []
+        chunk = _LazyChunk(_take_through(item, it, pred, split))
+        yield chunk
+        chunk._fill_cache()
+        if not split:
+            return
+        if max_split == 1:
+            yield _LazyChunk(it)
+            return
+        max_split -= 1
+
+
 def map_if(iterable, pred, func, func_else=lambda x: x):
     for item in iterable:
         yield func(item) if pred(item) else func_else(item)
 
 
+def _identity(x):
+    return x
+
+
+def _map_if_batch(batch, pred, func, func_else):
+    results = []
+    try:
+        for item in batch:
+            results.append(func(item) if pred(item) else func_else(item))
+    except Exception as e:
+        return results, e
+    return results, None
+
+
+def map_if_parallel(iterable, pred, func, func_else=_identity, *, executor='thread',
+                    max_workers=None, batch_size=64, max_in_flight=None, ordered=True):
+    '''
+        Like :func:`map_if`, but *pred*, *func* and *func_else* run on a
+        pool. *executor* is ``'thread'``, ``'process'`` or an existing
+        ``concurrent.futures.Executor`` (which is left running); with
+        processes the callables must be picklable.
+            list(map_if_parallel(range(5), lambda x: x % 2, lambda x: -x))
+            [0, -1, 2, -3, 4]
+        Items are sent to the pool in lists of *batch_size* (built with
+        :func:`chunked`) and at most *max_in_flight* items, which must be at
+        least *batch_size*, are submitted but not yet consumed. Results
+        come back in input order unless *ordered* is ``False``, in which
+        case each batch is yielded as soon as it finishes. An exception
+        raised by a worker is re-raised after the results that preceded it
+        in its batch.
+    '''
+    if batch_size < 1:
+        raise ValueError('batch_size must be at least 1')
+    if isinstance(executor, str) and executor not in ('thread', 'process'):
+        raise ValueError(f'unknown executor {executor!r}')
+    if max_in_flight is None:
+        max_in_flight = 2 * batch_size * (max_workers or cpu_count() or 1)
+    elif max_in_flight < batch_size:
+        raise ValueError('max_in_flight must be at least batch_size')
+    max_batches = max_in_flight // batch_size
+    return _map_if_parallel(
+        chunked(iterable, batch_size), (pred, func, func_else),
+        executor, max_workers, max_batches, ordered
+    )
+
+
+def _map_if_parallel(batches, funcs, executor, max_workers, max_batches, ordered):
+    # Imported here: concurrent.futures is slow to import and rarely needed.
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+    if executor == 'thread':
+        pool = ThreadPoolExecutor(max_workers)
+    elif executor == 'process':
+        pool = ProcessPoolExecutor(max_workers)
+    else:
+        pool = None
+    submit = (pool or executor).submit
+    pending = deque()
+
+    def next_done():
+        if ordered:
+            return pending.popleft()
+        future = next(iter(wait(pending, return_when=FIRST_COMPLETED).done))
+        pending.remove(future)
+        return future
+
+    def drain(limit):
+        while len(pending) > limit:
+            results, exc = next_done().result()
+            yield from results
+            if exc is not None:
+                raise exc
+
+    try:
+        for batch in batches:
+            pending.append(submit(_map_if_batch, batch, *funcs))
+            yield from drain(max_batches - 1)
+        yield from drain(0)
+    finally:
+        for future in pending:
+            future.cancel()
+        if pool is not None:
+            pool.shutdown()
+
+
+_shared = None
+
+
+def _attach_shared(source, target, fmt, ndarray):
+    global _shared
+    from multiprocessing.shared_memory import SharedMemory
+    if ndarray:
+        import numpy  # noqa: F401 (for _numpy())
+        _numpy()
+    _shared = SharedMemory(source), SharedMemory(target), fmt, ndarray
+
+
+def _apply_shared(func, start, stop):
+    source, target, fmt, ndarray = _shared
+    if ndarray:
+        dtype = np.dtype(fmt)
+        offset = start * dtype.itemsize
+        chunk = np.frombuffer(source.buf, dtype, stop - start, offset)
+        out = np.frombuffer(target.buf, dtype, stop - start, offset)
+        result = None
+        try:
+            result = func(chunk)
+            if np.shape(result) != chunk.shape:
+                raise ValueError('func must return as many items as it was given')
+            out[...] = result
+        finally:
+            del chunk, out, result
+        return
+    itemsize = calcsize(fmt)
+    views = [source.buf[start * itemsize:stop * itemsize], target.buf[start * itemsize:stop * itemsize]]
+    try:
+        chunk = views[0].cast(fmt)
+        views.append(chunk)
+        out = views[1].cast(fmt)
+        views.append(out)
+        result = func(chunk)
+        try:
+            result = memoryview(result)
+        except TypeError:
+            result = memoryview(array(fmt, result))
+        views.append(result)
+        if result.format != fmt:
+            result = memoryview(array(fmt, result.tolist()))
+            views.append(result)
+        if len(result) != len(out):
+            raise ValueError('func must return as many items as it was given')
+        out[:] = result
+    finally:
+        for view in reversed(views):
+            view.release()
+
+
+def map_chunks_shared(func, data, n, *, max_workers=None, out=None):
+    '''
+        Apply *func* to each *n*-item chunk of *data* on a process pool and
+        gather the results, in order, into one buffer of the same type:
+            map_chunks_shared(double, array('d', range(5)), 2)
+            array('d', [0.0, 2.0, 4.0, 6.0, 8.0])
+        *data* is a one-dimensional buffer (``array.array``, ``bytearray``,
+        ``bytes`` or ``ndarray``). It is copied once into
+        ``multiprocessing.shared_memory``, and each worker attaches to it
+        when it starts, so only ``(start, stop)`` pairs are sent per chunk.
+        *func* gets a ``memoryview`` (an ``ndarray`` view for NumPy input)
+        of its chunk and must return as many items, which are written
+        straight into a shared output buffer. The result is then copied
+        into *out* if given (a writable buffer of the same size), otherwise
+        into a new object like *data*. *func* must be picklable.
+    '''
+    if n < 1:
+        raise ValueError('n must be at least 1')
+    if _is_ndarray(data):
+        if data.ndim != 1:
+            raise ValueError('data must be one-dimensional')
+        data = np.ascontiguousarray(data)
+        fmt, ndarray = data.dtype.str, True
+    else:
+        view = _as_view(data)
+        if view is None:
+            raise TypeError('data must be a one-dimensional buffer')
+        fmt, ndarray = view.format, False
+        view.release()
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing.shared_memory import SharedMemory
+    size = len(data)
+    nbytes = memoryview(data).nbytes
+    source = SharedMemory(create=True, size=max(nbytes, 1))
+    target = SharedMemory(create=True, size=max(nbytes, 1))
+    try:
+        view = memoryview(data).cast('B')
+        source.buf[:nbytes] = view
+        view.release()
+        bounds = [(start, min(start + n, size)) for start in range(0, size, n)]
+        if bounds:
+            with ProcessPoolExecutor(
+                max_workers, initializer=_attach_shared, initargs=(source.name, target.name, fmt, ndarray)
+            ) as pool:
+                for future in [pool.submit(_apply_shared, func, start, stop) for start, stop in bounds]:
+                    future.result()
+        result = target.buf[:nbytes]
+        try:
+            if out is not None:
+                view = memoryview(out).cast('B')
+                if view.nbytes != nbytes:
+                    view.release()
+                    raise ValueError('out must be the same size as data')
+                view[:] = result
+                view.release()
+            elif ndarray:
+                out = np.frombuffer(result, data.dtype).copy()
+            elif isinstance(data, array):
+                out = array(data.typecode)
+                out.frombytes(result)
+            else:
+                out = type(data)(result) if isinstance(data, (bytes, bytearray)) else bytearray(result)
+        finally:
+            result.release()
+        return out
+    finally:
+        for shm in (source, target):
+            shm.close()
+            shm.unlink()
+
+
+_END = object()
+
+
+class _Prefetcher:
+    def __init__(self, iterable, depth, chunk_size=1):
+        self._queue = Queue(depth)
+        self._closed = Event()
+        self._done = False
+        self._thread = Thread(target=self._fill, args=(iter(iterable), chunk_size), daemon=True)
+        self._thread.start()
+
+    def _put(self, value):
+        while not self._closed.is_set():
+            try:
+                self._queue.put(value, timeout=0.05)
+                return True
+            except Full:
+                pass
+        return False
+
+    def _fill(self, it, chunk_size):
+        chunk = []
+        try:
+            while True:
+                chunk.extend(islice(it, chunk_size))
+                if not chunk:
+                    break
+                if not self._put(chunk):
+                    if isinstance(it, GeneratorType):
+                        it.close()
+                    return
+                chunk = []
+        except BaseException as e:
+            # Includes SystemExit and KeyboardInterrupt: the consumer would
+            # otherwise wait forever for the end of the queue.
+            if not chunk or self._put(chunk):
+                self._put(e)
+        else:
+            self._put(_END)
+
+    def get(self, timeout=None):
+        if self._done:
+            return []
+        value = self._queue.get(timeout=timeout)
+        if value is _END:
+            self._done = True
+            return []
+        if isinstance(value, BaseException):
+            self._done = True
+            raise value
+        return value
+
+    def close(self):
+        self._done = True
+        self._closed.set()
+
+
+def _check_prefetch(depth, chunk_size):
+    if depth < 1:
+        raise ValueError('depth must be at least 1')
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+
+
+def prefetch(iterable, depth=4, chunk_size=64):
+    '''
+        Read *iterable* on a background thread, up to *depth* chunks of
+        *chunk_size* items ahead of the consumer, so a slow producer (such
+        as one waiting on I/O) and the code consuming it overlap:
+            for record in prefetch(parse(read_blocks(path))):
+                ...
+        Items are handed over a whole chunk at a time. An exception raised
+        by *iterable*, including ``SystemExit`` and ``KeyboardInterrupt``,
+        is re-raised after the items before it. Closing the
+        returned generator, or dropping it, stops the thread; if *iterable*
+        is a generator it is closed there too. The thread starts on the
+        first ``next()``.
+    '''
+    _check_prefetch(depth, chunk_size)
+    return _prefetch(iterable, depth, chunk_size)
+
+
+def _prefetch(iterable, depth, chunk_size):
+    prefetcher = _Prefetcher(iterable, depth, chunk_size)
+    try:
+        while True:
+            chunk = prefetcher.get()
+            if not chunk:
+                return
+            yield from chunk
+    finally:
+        prefetcher.close()
+
+
+# pickle and tempfile are imported where they are used, as only spilling
+# needs them and they add noticeably to the import time of this module.
+class _SpillFile:
+    def __init__(self):
+        from tempfile import TemporaryFile
+        self._file = TemporaryFile()
+        self._offsets = array('Q')
+        self._end = 0
+
+    def append(self, item):
+        import pickle
+        self._file.seek(self._end)
+        pickle.dump(item, self._file, pickle.HIGHEST_PROTOCOL)
+        self._offsets.append(self._end)
+        self._end = self._file.tell()
+
+    def __getitem__(self, i):
+        import pickle
+        self._file.seek(self._offsets[i])
+        return pickle.load(self._file)
+
+    def __len__(self):
+        return len(self._offsets)
+
+
+_BATCH_HEADER = Struct('<QQ')
+_BUFFER_SIZE = Struct('<Q')
+
+
+def _dump_batch(file, batch):
+    import pickle
+    buffers = []
+    data = pickle.dumps(batch, 5, buffer_callback=buffers.append)
+    file.write(_BATCH_HEADER.pack(len(data), len(buffers)))
+    file.write(data)
+    for buffer in buffers:
+        raw = buffer.raw()
+        file.write(_BUFFER_SIZE.pack(raw.nbytes))
+        file.write(raw)
+
+
+def _load_batch(file):
+    import pickle
+    size, count = _BATCH_HEADER.unpack(file.read(_BATCH_HEADER.size))
+    data = file.read(size)
+    buffers = []
+    for _ in range(count):
+        buffer = bytearray(_BUFFER_SIZE.unpack(file.read(_BUFFER_SIZE.size))[0])
+        file.readinto(buffer)
+        buffers.append(buffer)
+    return pickle.loads(data, buffers=buffers)
+
+
+class SpillBuffer:
+    '''
+        A first-in first-out buffer that keeps at most *budget* items in
+        memory. Beyond that, items are pickled to a temporary file in
+        batches (protocol 5, with large buffers such as ``bytearray`` or
+        NumPy arrays written out of band) and read back when they reach
+        the front:
+            buffer = SpillBuffer(budget=2)
+            for i in range(5):
+                buffer.append(i)
+            len(buffer), buffer.spilled, buffer.popleft()
+            (5, 2, 0)
+        Items must be picklable once the budget is exceeded. The file is
+        truncated whenever the buffer has read back everything it spilled.
+    '''
+
+    def __init__(self, budget=4096):
+        if budget < 2:
+            raise ValueError('budget must be at least 2')
+        self._batch_size = budget // 2
+        self._capacity = budget - self._batch_size
+        self._memory = deque()
+        self._pending = []
+        self._batches = deque()
+        self._file = None
+        self._end = 0
+        self.spilled = 0
+
+    def __len__(self):
+        return len(self._memory) + self.spilled + len(self._pending)
+
+    def append(self, item):
+        if not self._batches and not self._pending and len(self._memory) < self._capacity:
+            self._memory.append(item)
+            return
+        self._pending.append(item)
+        if len(self._pending) >= self._batch_size:
+            if self._file is None:
+                from tempfile import TemporaryFile
+                self._file = TemporaryFile()
+            self._file.seek(self._end)
+            _dump_batch(self._file, self._pending)
+            self._batches.append((self._end, len(self._pending)))
+            self._end = self._file.tell()
+            self.spilled += len(self._pending)
+            self._pending = []
+
+    def popleft(self):
+        if not self._memory:
+            if self._batches:
+                offset, count = self._batches.popleft()
+                self._file.seek(offset)
+                self._memory.extend(_load_batch(self._file))
+                self.spilled -= count
+                if not self._batches:
+                    self._file.truncate(0)
+                    self._end = 0
+            elif self._pending:
+                self._memory.extend(self._pending)
+                self._pending = []
+            else:
+                raise IndexError('pop from an empty SpillBuffer')
+        return self._memory.popleft()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def spill_tee(iterable, n=2, budget=4096):
+    '''
+        Like ``itertools.tee``, but each of the *n* iterators keeps at most
+        *budget* items in memory and spills the rest to a temporary file
+        (see :class:`SpillBuffer`), so a consumer that falls far behind
+        the others doesn't hold the whole stream in memory.
+    '''
+    if n < 0:
+        raise ValueError('n must be >= 0')
+    from weakref import finalize
+    it = iter(iterable)
+    buffers = [SpillBuffer(budget) for _ in range(n)]
+    children = tuple(_spill_tee(it, buffer, buffers) for buffer in buffers)
+    for child, buffer in zip(children, buffers):
+        # A generator that is dropped before it starts never runs its
+        # finally clause, so its buffer would go on filling up.
+        finalize(child, _drop_spill_buffer, buffer, buffers)
+    return children
+
+
+def _drop_spill_buffer(own, buffers):
+    if own in buffers:
+        buffers.remove(own)
+        own.close()
+
+
+def _spill_tee(it, own, buffers):
+    try:
+        while True:
+            if own:
+                yield own.popleft()
+                continue
+            for item in it:
+                break
+            else:
+                return
+            for buffer in buffers:
+                if buffer is not own:
+                    buffer.append(item)
+            yield item
+    finally:
+        _drop_spill_buffer(own, buffers)
+
+
+def _spilled_reversed(it, budget):
+    from tempfile import TemporaryFile
+    with TemporaryFile() as file:
+        offsets = []
+        while True:
+            batch = take(it, budget)
+            if len(batch) < budget:
+                break
+            offsets.append(file.tell())
+            _dump_batch(file, batch)
+        yield from reversed(batch)
+        del batch
+        for offset in reversed(offsets):
+            file.seek(offset)
+            yield from reversed(_load_batch(file))
+
+
+class seekable:
+    '''
+        Wrap an iterator so it can be peeked at and rewound:
+            it = seekable(x for x in range(5))
+            it.peek(), next(it), next(it)
+            (0, 0, 1)
+            it.seek(0)
+            list(it)
+            [0, 1, 2, 3, 4]
+        Items are cached as they are read from the source. With *maxlen*
+        only the most recent *maxlen* items stay in memory; older ones are
+        dropped (and can no longer be sought to) unless *spill* is
+        ``True``, in which case they are pickled to a temporary file.
+        :func:`first`, :func:`one`, :func:`only` and :func:`strictly_n`
+        rewind a seekable to where it was once they are done, as long as
+        the cache still reaches back that far.
+    '''
+
+    def __init__(self, iterable, maxlen=None, spill=False):
+        if maxlen is not None and maxlen < 1:
+            raise ValueError('maxlen must be at least 1')
+        self._source = iter(iterable)
+        self._cache = deque()
+        self._maxlen = maxlen
+        self._spill = _SpillFile() if spill and maxlen is not None else None
+        self._offset = 0
+        self._index = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        index = self._index
+        if index < self._offset:
+            item = self._spill[index]
+        elif index < self._offset + len(self._cache):
+            item = self._cache[index - self._offset]
+        else:
+            item = next(self._source)
+            self._cache.append(item)
+            if self._maxlen is not None and len(self._cache) > self._maxlen:
+                evicted = self._cache.popleft()
+                if self._spill is not None:
+                    self._spill.append(evicted)
+                self._offset += 1
+        self._index = index + 1
+        return item
+
+    def peek(self, default=_marker):
+        try:
+            item = next(self)
+        except StopIteration:
+            if default is _marker:
+                raise
+            return default
+        self._index -= 1
+        return item
+
+    def tell(self):
+        return self._index
+
+    def seek(self, index):
+        if index < 0:
+            raise ValueError('index must not be negative')
+        if index < self._offset and self._spill is None:
+            raise ValueError(f'item {index} is no longer cached')
+        cached = self._offset + len(self._cache)
+        if index <= cached:
+            self._index = index
+        else:
+            self._index = cached
+            deque(islice(self, index - cached), maxlen=0)
+
+    def relative_seek(self, count):
+        self.seek(max(self._index + count, 0))
+
+    def _rewind(self, index):
+        if index >= self._offset or self._spill is not None:
+            self._index = index
+
+    def _lookahead(self, func, *args):
+        index = self._index
+        try:
+            return func((item for item in self), *args)
+        finally:
+            self._rewind(index)
+
+    def _lookahead_iter(self, func, *args):
+        index = self._index
+        try:
+            yield from func((item for item in self), *args)
+        finally:
+            self._rewind(index)
+
+
 class time_limited:
-    def __init__(self, limit_second, iterable):
+    '''
+        Yield items from *iterable* until *limit_second* seconds have passed.
+        The clock is read after every item by default. Pass *check_every*
+        to read it after every N items instead, or ``'auto'`` to read it
+        after every item while items are slow compared to the time left
+        and after every few items (at most every 1024) while they arrive
+        quickly. Items that arrive after the deadline between two checks
+        are still returned, so if a fast source suddenly slows down the
+        limit can be overshot by up to 1024 of the slow items.
+        With *preemptive* ``True`` the source is read on a background thread
+        that stays up to *prefetch* items ahead, and iteration stops at the
+        deadline even while the source is blocked. The thread starts on the
+        first ``next()`` and is stopped by :meth:`close`, at the deadline or
+        when the object is dropped; it can't be interrupted, so it stops
+        after the item it is waiting for arrives.
+    '''
+    _MAX_STRIDE = 1024
+
+    def __init__(self, limit_second, iterable, check_every=None, preemptive=False, prefetch=64):
         if limit_second < 0:
             raise ValueError
+        self._adaptive = check_every == 'auto'
+        if self._adaptive or check_every is None:
+            check_every = 1
+        elif check_every < 1:
+            raise ValueError("check_every must be at least 1 or 'auto'")
         self._limit_second = limit_second
         self._iterable = iterable
-        self._start_time = monotonic()
+        self._check_every = check_every
+        self._start_time = self._last_check = monotonic()
+        self._stride = self._countdown = 1
+        self._preemptive = preemptive
+        self._prefetch = prefetch
+        self._prefetcher = None
         self.timed_out = False
 
     def __iter__(self):
         return self
 
     def __next__(self):
+        if self._preemptive:
+            return self._next_preemptive()
         item = next(self._iterable)
-        if monotonic() - self._start_time > self._limit_second:
+        self._countdown -= 1
+        if self._countdown:
+            return item
+        now = monotonic()
+        elapsed = now - self._start_time
+        if elapsed > self._limit_second:
             self.timed_out = True
             raise StopIteration
+        if self._adaptive:
+            per_item = (now - self._last_check) / self._stride
+            if self._stride < self._MAX_STRIDE and per_item * self._stride * 16 < self._limit_second - elapsed:
+                self._stride *= 2
+            else:
+                self._stride = 1
+            self._last_check = now
+            self._countdown = self._stride
+        else:
+            self._countdown = self._check_every
         return item
 
+    def _next_preemptive(self):
+        if self._prefetcher is None:
+            self._prefetcher = _Prefetcher(self._iterable, self._prefetch)
+        remaining = self._limit_second - (monotonic() - self._start_time)
+        try:
+            if remaining <= 0:
+                raise Empty
+            chunk = self._prefetcher.get(timeout=remaining)
+        except Empty:
+            self.timed_out = True
+            self._prefetcher.close()
+            raise StopIteration from None
+        if not chunk:
+            raise StopIteration
+        return chunk[0]
+
+    def close(self):
+        '''End iteration and stop the background thread, if there is one.'''
+        self._iterable = iter(())
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+
+    def __del__(self):
+        prefetcher = getattr(self, '_prefetcher', None)
+        if prefetcher is not None:
+            prefetcher.close()
+
 
 def difference(iterable, func=sub, *, initial=None):
-    a, b = tee(iterable)
+    if _is_ndarray(iterable) and iterable.dtype.kind in 'iufc':
+        ufunc = _np_ufunc(func)
+        if ufunc is not None:
+            return _np_difference(iterable, ufunc, initial)
+    if isinstance(iterable, Sequence):
+        if not iterable:
+            return iter([])
+        first = [] if initial is not None else [iterable[0]]
+        return chain(first, map(func, islice(iterable, 1, None), iterable))
+    return _difference(iter(iterable), func, initial)
 
-    try:
-        first = [next(b)]
-    except StopIteration:
-        return iter([])
-    if initial is not None:
-        first = []
-    return chain(first, starmap(func, zip(b, a)))
+
+def _difference(it, func, initial):
+    for previous in it:
+        if initial is None:
+            yield previous
+        for item in it:
+            yield func(item, previous)
+            previous = item
+
+
+def _chunk_typecodes(typecode, values):
+    yield typecode
+    if all(type(value) is int for value in values):
+        yield from 'qQ'
+    elif all(type(value) in (int, float) for value in values):
+        yield 'd'
+
+
+def _chunk_like(chunk, values):
+    values = list(values)
+    if isinstance(chunk, array):
+        # Results that don't fit the input typecode (negative differences
+        # of unsigned items, quotients of integers) widen to 64-bit
+        # integers or doubles, and anything else comes back as a list.
+        for typecode in _chunk_typecodes(chunk.typecode, values):
+            try:
+                return array(typecode, values)
+            except (OverflowError, TypeError):
+                pass
+        return values
+    if _is_ndarray(chunk):
+        return np.array(values) if values else chunk[:0]
+    return values
+
+
+def difference_chunks(chunks, func=sub, *, initial=None):
+    '''
+        Like :func:`difference` for a stream split into chunks such as
+        ``array.array`` or ``ndarray``. Each chunk is differenced as a
+        whole and the last value of one chunk is carried into the next,
+        so the output chunks line up with the input chunks:
+            [list(c) for c in difference_chunks([[1, 3], [6, 10]])]
+            [[1, 2], [3, 4]]
+        ``array.array`` chunks come back as arrays of the same typecode,
+        widened when the results don't fit it, and NumPy chunks use the
+        ufunc matching *func* when there is one.
+    '''
+    previous = _marker
+    for chunk in chunks:
+        if not len(chunk):
+            yield chunk[:0]
+            continue
+        ufunc = _np_ufunc(func) if _is_ndarray(chunk) else None
+        if ufunc is not None:
+            if previous is _marker:
+                head = chunk[:0] if initial is not None else chunk[:1]
+                out = np.concatenate((head, ufunc(chunk[1:], chunk[:-1])))
+            else:
+                out = ufunc(chunk, np.concatenate(((previous,), chunk[:-1])))
+        else:
+            if previous is _marker:
+                head = [] if initial is not None else [chunk[0]]
+            else:
+                head = [func(chunk[0], previous)]
+            out = _chunk_like(chunk, chain(head, map(func, islice(chunk, 1, None), chunk)))
+        previous = chunk[-1]
+        yield out
+
+
+def accumulate_chunks(chunks, func=add, *, initial=None):
+    '''
+        The inverse of :func:`difference_chunks`: a running
+        ``itertools.accumulate`` over a chunked stream that carries the
+        total across chunk boundaries.
+            [list(c) for c in accumulate_chunks([[1, 2], [3, 4]])]
+            [[1, 3], [6, 10]]
+        As with ``itertools.accumulate``, *initial* is emitted first, at
+        the start of the first chunk.
+    '''
+    total = _marker if initial is None else initial
+    emit_initial = initial is not None
+    for chunk in chunks:
+        ufunc = _np_ufunc(func) if _is_ndarray(chunk) else None
+        if total is _marker:
+            if not len(chunk):
+                yield chunk[:0]
+                continue
+            values = accumulate(chunk, func) if ufunc is None else ufunc.accumulate(chunk)
+        elif ufunc is None:
+            values = accumulate(chunk, func, initial=total)
+            if not emit_initial:
+                next(values)
+        else:
+            values = ufunc.accumulate(np.concatenate(((total,), chunk)))
+            if not emit_initial:
+                values = values[1:]
+        emit_initial = False
+        out = values if ufunc is not None else _chunk_like(chunk, values)
+        if len(out):
+            total = out[-1]
+        yield out
+
+
+def windowed(iterable, n, step=1, fillvalue=None):
+    '''
+        Yield tuples of *n* consecutive items, starting a new window every
+        *step* items. The last window is padded with *fillvalue* if the
+        items run out part way through it:
+            list(windowed([1, 2, 3, 4, 5], 3, step=2))
+            [(1, 2, 3), (3, 4, 5)]
+            list(windowed([1, 2, 3, 4], 3, step=2))
+            [(1, 2, 3), (3, 4, None)]
+        Only the current window is kept, in a single deque.
+    '''
+    if n < 0:
+        raise ValueError('n must be >= 0')
+    if step < 1:
+        raise ValueError('step must be >= 1')
+    return _windowed(iterable, n, step, fillvalue)
+
+
+def _windowed(iterable, n, step, fillvalue):
+    if n == 0:
+        yield ()
+        return
+    window = deque(maxlen=n)
+    countdown = n
+    for _ in map(window.append, iterable):
+        countdown -= 1
+        if not countdown:
+            countdown = step
+            yield tuple(window)
+    size = len(window)
+    if not size:
+        return
+    if size < n:
+        yield tuple(chain(window, repeat(fillvalue, n - size)))
+    elif 0 < countdown < min(step, n):
+        window.extend(repeat(fillvalue, countdown))
+        yield tuple(window)
+
+
+def _rolling_sum(iterable, n):
+    it = iter(iterable)
+    window = deque(islice(it, n), maxlen=n)
+    if len(window) < n:
+        return
+    total = sum(window)
+    yield total
+    countdown = n
+    for item in it:
+        total += item - window[0]
+        window.append(item)
+        countdown -= 1
+        if not countdown:
+            # Re-add the window once every n steps so float error cannot build up.
+            countdown = n
+            total = sum(window)
+        yield total
+
+
+def _rolling_mean(iterable, n):
+    return map(truediv, _rolling_sum(iterable, n), repeat(n))
+
+
+def _rolling_extreme(iterable, n, better):
+    # Candidates are (position, value) pairs whose values strictly improve
+    # from back to front, so the front is always the window's extreme.
+    candidates = deque()
+    for i, item in enumerate(iterable):
+        while candidates and not better(candidates[-1][1], item):
+            candidates.pop()
+        candidates.append((i, item))
+        if candidates[0][0] <= i - n:
+            candidates.popleft()
+        if i >= n - 1:
+            yield candidates[0][1]
+
+
+def _rolling_min(iterable, n):
+    return _rolling_extreme(iterable, n, lt)
+
+
+def _rolling_max(iterable, n):
+    return _rolling_extreme(iterable, n, gt)
+
+
+_ROLLING = {
+    'sum': (_rolling_sum, _np_rolling_sum),
+    'mean': (_rolling_mean, _np_rolling_mean),
+    'min': (_rolling_min, _np_rolling_min),
+    'max': (_rolling_max, _np_rolling_max),
+}
+_ROLLING_BLOCK = 1 << 16
+
+
+def _check_rolling(n, aggregate):
+    if aggregate not in _ROLLING:
+        raise ValueError(f"aggregate must be one of {', '.join(_ROLLING)}, not {aggregate!r}")
+    if index(n) < 1:
+        raise ValueError('n must be >= 1')
+
+
+def _is_numeric_ndarray(obj):
+    return _is_ndarray(obj) and obj.ndim == 1 and obj.dtype.kind in 'biuf'
+
+
+def _rolling(iterable, n, aggregate):
+    _check_rolling(n, aggregate)
+    if _is_numeric_ndarray(iterable):
+        block = max(n, _ROLLING_BLOCK)
+        if len(iterable) <= block:
+            return _ROLLING[aggregate][1](iterable, n)
+        return np.concatenate(list(_rolling_chunks(_np_chunked(iterable, block, False), n, aggregate)))
+    return _ROLLING[aggregate][0](iterable, n)
+
+
+def rolling_sum(iterable, n):
+    '''
+        Yield the sum of each window of *n* consecutive items, one per
+        item from the *n*-th on, at O(1) cost per item:
+            list(rolling_sum([1, 2, 3, 4, 5], 3))
+            [6, 9, 12]
+        A 1-D numeric ``ndarray`` gives an ``ndarray``, computed from
+        cumulative sums block by block so float error stays bounded.
+    '''
+    return _rolling(iterable, n, 'sum')
+
+
+def rolling_mean(iterable, n):
+    '''
+        Like :func:`rolling_sum`, divided by *n*:
+            list(rolling_mean([1, 2, 3, 4, 5], 2))
+            [1.5, 2.5, 3.5, 4.5]
+    '''
+    return _rolling(iterable, n, 'mean')
+
+
+def rolling_min(iterable, n):
+    '''
+        Yield the smallest item of each window of *n* consecutive items,
+        using a monotonic deque so each item is pushed and popped once:
+            list(rolling_min([3, 1, 4, 1, 5, 9, 2], 3))
+            [1, 1, 1, 1, 2]
+        A 1-D numeric ``ndarray`` gives an ``ndarray``.
+    '''
+    return _rolling(iterable, n, 'min')
+
+
+def rolling_max(iterable, n):
+    '''
+        Like :func:`rolling_min`, for the largest item:
+            list(rolling_max([3, 1, 4, 1, 5, 9, 2], 3))
+            [4, 4, 5, 9, 9]
+    '''
+    return _rolling(iterable, n, 'max')
+
+
+def _rolling_typecode(typecode, aggregate):
+    if aggregate == 'mean' or aggregate == 'sum' and typecode in 'fd':
+        return 'd'
+    if aggregate == 'sum':
+        return 'Q' if typecode in 'BHILQ' else 'q'
+    return typecode
+
+
+def rolling_chunks(chunks, n, aggregate='sum'):
+    '''
+        Apply :func:`rolling_sum`, :func:`rolling_mean`, :func:`rolling_min`
+        or :func:`rolling_max` (*aggregate* is ``'sum'``, ``'mean'``,
+        ``'min'`` or ``'max'``) to a stream split into chunks. The last
+        ``n - 1`` items of each chunk are carried into the next, so once
+        the first window is complete each output chunk has one value per
+        input item:
+            [list(c) for c in rolling_chunks([[1, 2, 3], [4, 5]], 2)]
+            [[3, 5], [7, 9]]
+        NumPy chunks are computed with vectorized code and ``array.array``
+        chunks come back as arrays (``'d'`` for means, 64-bit integers for
+        integer sums). Memory is bounded by the chunk size, so streams of
+        10**8 samples can be read and aggregated chunk by chunk.
+    '''
+    _check_rolling(n, aggregate)
+    return _rolling_chunks(chunks, n, aggregate)
+
+
+def _rolling_chunks(chunks, n, aggregate):
+    generic, vectorized = _ROLLING[aggregate]
+    tail = []
+    for chunk in chunks:
+        if _is_numeric_ndarray(chunk):
+            window = np.concatenate((tail, chunk)) if len(tail) else chunk
+            out = vectorized(window, n)
+            tail = window[max(len(window) - n + 1, 0):].copy() if n > 1 else []
+        else:
+            window = list(chain(tail, chunk))
+            out = generic(window, n)
+            if isinstance(chunk, array):
+                out = array(_rolling_typecode(chunk.typecode, aggregate), out)
+            else:
+                out = list(out)
+            tail = window[max(len(window) - n + 1, 0):] if n > 1 else []
+        yield out
+
+
+_LEAF_TYPES = frozenset((int, float, bool, complex, str, bytes, type(None)))
 
 
 def value_chain(*args):
     for value in args:
-        if isinstance(value, (str, bytes)):
+        if type(value) in _LEAF_TYPES or isinstance(value, (str, bytes)):
             yield value
             continue
         try:
@@ -261,17 +2092,274 @@ def value_chain(*args):
             yield value
 
 
-class SequenceView:
+def collapse(iterable, base_type=None, levels=None):
+    '''
+        Flatten an arbitrarily nested iterable. As in :func:`value_chain`,
+        strings and bytes are not iterated into, nor are instances of
+        *base_type*; *levels* stops after that many levels of nesting:
+            list(collapse([1, [2, (3, [4])], 'ab', {'k': 5}]))
+            [1, 2, 3, 4, 'ab', 'k']
+            list(collapse([1, [2, (3, [4])]], levels=2))
+            [1, 2, 3, [4]]
+        The nesting is walked with an explicit stack, so depth is not
+        limited by the recursion limit. Lists and tuples that hold only
+        scalars and strings are yielded from in one go.
+    '''
+    atomic = (str, bytes) if base_type is None else (str, bytes, base_type)
+    return _collapse(iterable, atomic, levels)
+
+
+def _collapse(node, atomic, levels):
+    if (levels is not None and levels < 0) or isinstance(node, atomic):
+        yield node
+        return
+    try:
+        stack = [iter(node)]
+    except TypeError:
+        yield node
+        return
+    while stack:
+        for child in stack[-1]:
+            cls = type(child)
+            if cls in _LEAF_TYPES or (levels is not None and len(stack) > levels) or isinstance(child, atomic):
+                yield child
+                continue
+            if cls is list or cls is tuple:
+                if set(map(type, child)) <= _LEAF_TYPES:
+                    yield from child
+                    continue
+                stack.append(iter(child))
+            elif cls is dict:
+                stack.append(iter(child))
+            else:
+                try:
+                    stack.append(iter(child))
+                except TypeError:
+                    yield child
+                    continue
+            break
+        else:
+            stack.pop()
+
+
+class SequenceView(Sequence):
+    '''
+        A read-only view of the sequence *target* that follows changes to
+        it. Slicing a view returns another view of the same target, with
+        the start/stop/step composed and nothing copied:
+            view = SequenceView(list(range(10)))
+            window = view[2:8][::2]
+            list(window)
+            [2, 4, 6]
+        A sliced view keeps the indices it was created with, so it isn't
+        resized when the target is.
+    '''
+
     def __init__(self, target):
         if not isinstance(target, Sequence):
             raise TypeError
         self._target = target
+        self._indices = None
+
+    @classmethod
+    def _window(cls, target, indices):
+        view = cls.__new__(cls)
+        view._target = target
+        view._indices = indices
+        return view
+
+    def _range(self):
+        if self._indices is None:
+            return range(len(self._target))
+        return self._indices
 
     def __getitem__(self, index):
-        return self._target[index]
+        if isinstance(index, slice):
+            return self._window(self._target, self._range()[index])
+        if self._indices is None:
+            return self._target[index]
+        return self._target[self._indices[index]]
 
     def __len__(self):
-        return len(self._target)
+        if self._indices is None:
+            return len(self._target)
+        return len(self._indices)
+
+    def __iter__(self):
+        if self._indices is None:
+            return iter(self._target)
+        return map(self._target.__getitem__, self._indices)
+
+    def __reversed__(self):
+        if self._indices is None:
+            return reversed(self._target)
+        return map(self._target.__getitem__, reversed(self._indices))
+
+    def index(self, value, start=0, stop=None):
+        positions = range(len(self))[start:stop]
+        items = map(self._target.__getitem__, self._range()[start:stop])
+        return positions.start + indexOf(items, value)
+
+    def count(self, value):
+        return countOf(iter(self), value)
 
     def __repr__(self):
-        return f'{self.__class__.__name__}({self._target})'
+        if self._indices is None:
+            return f'{self.__class__.__name__}({self._target})'
+        indices = self._indices
+        stop = '' if indices.stop < 0 else indices.stop
+        return f'{self.__class__.__name__}({self._target})[{indices.start}:{stop}:{indices.step}]'
+
+
+def _first_sequence(sequence, default=_marker):
+    if len(sequence):
+        return sequence[0]
+    return _first(sequence, default)
+
+
+def _one_sized(iterable, too_short=None, too_lang=None):
+    if len(iterable) == 1:
+        for item in iterable:
+            return item
+    return _one(iterable, too_short, too_lang)
+
+
+def _only_sized(iterable, default=None, too_lang=None):
+    size = len(iterable)
+    if not size:
+        return default
+    if size == 1:
+        for item in iterable:
+            return item
+    return _only(iterable, default, too_lang)
+
+
+def _strictly_n_sized(iterable, n, too_short=None, too_long=None):
+    if len(iterable) == n:
+        return iter(iterable)
+    return _strictly_n(iterable, n, too_short, too_long)
+
+
+def _first_seekable(iterable, default=_marker):
+    return iterable._lookahead(_first, default)
+
+
+def _one_seekable(iterable, too_short=None, too_lang=None):
+    return iterable._lookahead(_one, too_short, too_lang)
+
+
+def _only_seekable(iterable, default=None, too_lang=None):
+    return iterable._lookahead(_only, default, too_lang)
+
+
+def _strictly_n_seekable(iterable, n, too_short=None, too_long=None):
+    return iterable._lookahead_iter(_strictly_n, n, too_short, too_long)
+
+
+def _chunked_sequence(sequence, n, strict, zero_copy):
+    if zero_copy or n is not None and not _is_stop(n):
+        return _chunked(sequence, n, strict, zero_copy)
+    chunks = _sliced(sequence, n, strict)
+    return chunks if sequence.__class__ is list else map(list, chunks)
+
+
+class _Dispatcher:
+    def __init__(self, generic):
+        self._function = singledispatch(generic)
+        self._cache = {}
+        self._token = get_cache_token()
+
+    def register(self, cls, implementation):
+        self._function.register(cls, implementation)
+        self._cache.clear()
+
+    def __getitem__(self, cls):
+        # As in singledispatch, ABC.register() changes the token and may
+        # change which implementation a class gets.
+        token = get_cache_token()
+        if token != self._token:
+            self._cache.clear()
+            self._token = token
+        try:
+            return self._cache[cls]
+        except KeyError:
+            _numpy()
+            implementation = self._cache[cls] = self._function.dispatch(cls)
+            return implementation
+
+
+_DISPATCH = {
+    'first': _Dispatcher(_first),
+    'last': _Dispatcher(_last),
+    'nth_or_last': _Dispatcher(_nth_or_last),
+    'one': _Dispatcher(_one),
+    'only': _Dispatcher(_only),
+    'strictly_n': _Dispatcher(_strictly_n),
+    'split_into': _Dispatcher(_split_into),
+    'chunked': _Dispatcher(_chunked),
+}
+
+
+def register(function, cls, implementation=None):
+    '''
+        Register *implementation* as the version of *function* (one of
+        :func:`first`, :func:`last`, :func:`nth_or_last`, :func:`one`,
+        :func:`only`, :func:`strictly_n`, :func:`split_into` and
+        :func:`chunked`) used when the iterable is an instance of *cls*.
+        As with ``functools.singledispatch``, the most specific class in
+        the MRO wins and *cls* may be an abstract base class; without
+        *implementation* it returns a decorator:
+            @register(last, Column)
+            def _(column, default=_marker):
+                return column.values[-1] if len(column) else default
+        The implementation takes the same arguments as *function*, except
+        that :func:`chunked` passes ``(iterable, n, strict, zero_copy)`` and
+        :func:`split_into` ``(iterable, sizes)``; prefetching and argument
+        checks happen before it is called.
+        Built in are ``Sized`` (length checks for :func:`one`, :func:`only`
+        and :func:`strictly_n`), ``Sequence`` (indexing for :func:`first`,
+        :func:`last` and :func:`nth_or_last`; slicing for the concrete
+        sequence and buffer types in :func:`chunked` and
+        :func:`split_into`), :class:`seekable`, files and NumPy arrays.
+        ``range`` is a sequence, so it is served by index arithmetic.
+    '''
+    name = getattr(function, '__name__', function)
+    try:
+        dispatcher = _DISPATCH[name]
+    except KeyError:
+        raise ValueError(f'{name!r} does not dispatch on the type of its iterable') from None
+
+    def decorator(implementation):
+        dispatcher.register(cls, implementation)
+        return implementation
+
+    return decorator if implementation is None else decorator(implementation)
+
+
+register(first, Sequence, _first_sequence)
+register(last, Reversible, _last_reversible)
+register(last, Sequence, _last_sequence)
+register(last, mmap, _last_reversible)
+register(last, IOBase, _last_file)
+register(nth_or_last, Sequence, _nth_or_last_sequence)
+register(nth_or_last, IOBase, _nth_or_last_file)
+register(split_into, IOBase, _split_into_file)
+register(one, Sized, _one_sized)
+register(only, Sized, _only_sized)
+register(strictly_n, Sized, _strictly_n_sized)
+register(first, seekable, _first_seekable)
+register(one, seekable, _one_seekable)
+register(only, seekable, _only_seekable)
+register(strictly_n, seekable, _strictly_n_seekable)
+for _cls in (list, tuple, str, bytes, bytearray, range, array, memoryview):
+    register(chunked, _cls, _chunked_sequence)
+    register(split_into, _cls, _split_into_sequence)
+
+
+def _register_numpy():
+    register(chunked, np.ndarray, _np_chunked)
+    register(split_into, np.ndarray, _np_split_into)
+
+if os.environ.get('CHUNKED_PROFILE'):
+    import chunked_profile
+    chunked_profile._enable_from_environment()
@@ -0,0 +1,184 @@
+'''
+    A fluent builder over the functions in :mod:`chunked`:
+        pipeline = Pipeline(rows).map_if(is_valid, parse).split_after(is_last).chunked(500)
+        print(pipeline.explain())
+        for batch in pipeline:
+            ...
+    Each method returns a new :class:`Pipeline`, so a partly built one can
+    be reused. Adjacent per-item stages (``map``, ``map_if`` and ``filter``)
+    are fused: the source is read in batches of *batch_size* items and each
+    stage runs over a whole batch with the builtin ``map`` and ``filter``,
+    instead of one generator per stage per item. An exception raised by
+    one of the functions still comes out after every item that preceded
+    it, but within a batch the stages run one after the other, so the
+    functions must not depend on being called item by item across stages.
+    A fused group followed by ``chunked(n)`` maps the source chunks
+    directly, without flattening and re-chunking. The source is read a whole
+    batch at a time though, so use ``batch_size=1`` if it must not be
+    read ahead.
+'''
+from functools import partial
+from itertools import chain
+from operator import sub
+
+import chunked
+from chunked import _identity, _marker
+
+_ITEM_STAGES = {'map', 'map_if', 'filter'}
+
+
+def _name(obj):
+    return getattr(obj, '__qualname__', None) or repr(obj)
+
+
+def _raising(exc):
+    raise exc
+    yield
+
+
+def _map_if(pred, func, func_else, batch):
+    if func_else is _identity:
+        return (func(item) if pred(item) else item for item in batch)
+    return (func(item) if pred(item) else func_else(item) for item in batch)
+
+
+def _fuse(stages):
+    ops = []
+    for name, args, kwargs in stages:
+        if name == 'map':
+            ops.append(partial(map, args[0]))
+        elif name == 'filter':
+            ops.append(partial(filter, args[0]))
+        else:
+            ops.append(partial(_map_if, *args))
+    return tuple(ops)
+
+
+def _run_batch(ops, batch):
+    for i, op in enumerate(ops):
+        results = []
+        try:
+            results.extend(op(batch))
+        except Exception as e:
+            return chain(_run_batch(ops[i + 1:], results), _raising(e))
+        batch = results
+    return batch
+
+
+def _run_chunk(ops, chunk):
+    for op in ops:
+        chunk = list(op(chunk))
+    return chunk
+
+
+class Pipeline:
+    def __init__(self, iterable, batch_size=256):
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1')
+        self._source = iterable
+        self._batch_size = batch_size
+        self._stages = ()
+
+    def _then(self, name, *args, **kwargs):
+        pipeline = Pipeline.__new__(Pipeline)
+        pipeline._source = self._source
+        pipeline._batch_size = self._batch_size
+        pipeline._stages = self._stages + ((name, args, kwargs),)
+        return pipeline
+
+    def map(self, func):
+        return self._then('map', func)
+
+    def filter(self, pred):
+        return self._then('filter', pred)
+
+    def map_if(self, pred, func, func_else=_identity):
+        return self._then('map_if', pred, func, func_else)
+
+    def chunked(self, n, strict=False):
+        if strict and n is None:
+            raise ValueError('n cant be none when strict is True')
+        return self._then('chunked', n, strict)
+
+    def constrained_batches(self, max_size, max_count=None, get_len=len, strict=True):
+        return self._then('constrained_batches', max_size, max_count, get_len, strict)
+
+    def split_after(self, pred, max_split=-1):
+        return self._then('split_after', pred, max_split)
+
+    def split_into(self, sizes):
+        return self._then('split_into', sizes)
+
+    def difference(self, func=sub, *, initial=None):
+        return self._then('difference', func, initial=initial)
+
+    def strictly_n(self, n, too_short=None, too_long=None):
+        return self._then('strictly_n', n, too_short, too_long)
+
+    def time_limited(self, limit_second, **kwargs):
+        return self._then('time_limited', limit_second, **kwargs)
+
+    def _plan(self):
+        plan = []
+        group = []
+        for stage in self._stages:
+            name, args, kwargs = stage
+            if name in _ITEM_STAGES:
+                group.append(stage)
+                continue
+            if group:
+                filtered = any(s[0] == 'filter' for s in group)
+                if name == 'chunked' and args[0] is not None and not filtered:
+                    plan.append(('fused_chunked', tuple(group), args))
+                    group = []
+                    continue
+                plan.append(('fused', tuple(group), None))
+                group = []
+            plan.append((name, args, kwargs))
+        if group:
+            plan.append(('fused', tuple(group), None))
+        return plan
+
+    def explain(self):
+        '''Describe the stages that will run, with the fused ones grouped.'''
+        lines = [f'source: {type(self._source).__name__}']
+        for kind, first, second in self._plan():
+            if kind in ('fused', 'fused_chunked'):
+                steps = ' -> '.join(
+                    f"{name}({', '.join(map(_name, args))})" for name, args, kwargs in first
+                )
+                if kind == 'fused':
+                    lines.append(f'fused[batch_size={self._batch_size}]: {steps}')
+                else:
+                    lines.append(f'fused[batch_size={second[0]}]: {steps} -> chunked({second[0]}, {second[1]})')
+            else:
+                params = list(map(_name, first))
+                params += [f'{key}={value!r}' for key, value in second.items()]
+                lines.append(f"{kind}({', '.join(params)})")
+        return '\n'.join(lines)
+
+    def __iter__(self):
+        it = self._source
+        for kind, first, second in self._plan():
+            if kind == 'fused':
+                run = partial(_run_batch, _fuse(first))
+                it = chain.from_iterable(map(run, chunked.chunked(it, self._batch_size)))
+            elif kind == 'fused_chunked':
+                it = map(partial(_run_chunk, _fuse(first)), chunked.chunked(it, *second))
+            elif kind == 'time_limited':
+                it = chunked.time_limited(first[0], iter(it), **second)
+            else:
+                it = getattr(chunked, kind)(it, *first, **second)
+        return iter(it)
+
+    def to_list(self):
+        return list(self)
+
+    def first(self, default=_marker):
+        return chunked.first(iter(self), default)
+
+    def last(self, default=_marker):
+        return chunked.last(iter(self), default)
+
+    def one(self, too_short=None, too_lang=None):
+        return chunked.one(iter(self), too_short, too_lang)
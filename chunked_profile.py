@@ -0,0 +1,280 @@
+'''
+    Opt-in instrumentation for the public functions of :mod:`chunked`.
+    Switch it on for a block of code:
+        with chunked_profile.profiling() as profile:
+            run_pipeline()
+        print(profile.to_prometheus())
+    or for a whole process by setting ``CHUNKED_PROFILE=1`` before
+    :mod:`chunked` is imported; ``CHUNKED_PROFILE_OUTPUT=path`` then writes
+    the results at exit, as Prometheus text if *path* ends in ``.prom``
+    and as JSON otherwise.
+    While profiling is on, the functions in the ``chunked`` module are
+    replaced by wrappers that record, per call site, the number of calls
+    and items produced, the time spent in the function and in ``next()``
+    on its input iterators, and the size distribution of the chunks it
+    yields. Turning it off puts the original functions back, so there is
+    no overhead at all when it is off. Names imported with
+    ``from chunked import ...`` before profiling started are not seen,
+    and neither are calls that ``chunked`` makes to itself.
+'''
+import json
+import os
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from inspect import isfunction
+from io import IOBase
+from threading import Lock
+from time import perf_counter
+
+import chunked
+
+CHUNKING = {
+    'chunked', 'constrained_batches', 'split_after', 'split_after_bytes', 'split_into',
+    'difference_chunks', 'accumulate_chunks',
+}
+NOT_PROFILED = {'raise_', 'register'}
+
+_active = None
+_originals = {}
+
+
+class CallSiteStats:
+    __slots__ = ('function', 'site', 'calls', 'items', 'seconds', 'upstream_seconds',
+                 'chunk_sizes', 'chunk_size_sum')
+
+    def __init__(self, function, site):
+        self.function = function
+        self.site = site
+        self.calls = 0
+        self.items = 0
+        self.seconds = 0.0
+        self.upstream_seconds = 0.0
+        self.chunk_sizes = defaultdict(int)
+        self.chunk_size_sum = 0
+
+    @property
+    def own_seconds(self):
+        return max(self.seconds - self.upstream_seconds, 0.0)
+
+    def record_chunk(self, size):
+        # Buckets are the smallest power of two >= size, matching Prometheus' le.
+        self.chunk_sizes[1 << (size - 1).bit_length() if size else 0] += 1
+        self.chunk_size_sum += size
+
+    def as_dict(self):
+        return {
+            'function': self.function,
+            'site': self.site,
+            'calls': self.calls,
+            'items': self.items,
+            'seconds': self.seconds,
+            'upstream_seconds': self.upstream_seconds,
+            'own_seconds': self.own_seconds,
+            'chunk_sizes': {str(bound): count for bound, count in sorted(self.chunk_sizes.items())},
+        }
+
+
+class Profile:
+    def __init__(self):
+        self._sites = {}
+        self._lock = Lock()
+
+    def site(self, function, filename, lineno):
+        key = (function, filename, lineno)
+        stats = self._sites.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self._sites.setdefault(key, CallSiteStats(function, f'{filename}:{lineno}'))
+        return stats
+
+    def __iter__(self):
+        return iter(list(self._sites.values()))
+
+    def to_json(self, **kwargs):
+        return json.dumps([stats.as_dict() for stats in self], **kwargs)
+
+    def to_prometheus(self):
+        lines = []
+        for name, kind, doc, value in [
+            ('chunked_calls_total', 'counter', 'Calls per call site.', lambda s: s.calls),
+            ('chunked_items_total', 'counter', 'Items produced.', lambda s: s.items),
+            ('chunked_seconds_total', 'counter', 'Time spent producing items.', lambda s: s.seconds),
+            ('chunked_upstream_seconds_total', 'counter', 'Time spent in next() on inputs.',
+             lambda s: s.upstream_seconds),
+        ]:
+            lines.append(f'# HELP {name} {doc}')
+            lines.append(f'# TYPE {name} {kind}')
+            for stats in self:
+                lines.append(f'{name}{{{_labels(stats)}}} {value(stats)}')
+        lines.append('# HELP chunked_chunk_size Size of the chunks yielded.')
+        lines.append('# TYPE chunked_chunk_size histogram')
+        for stats in self:
+            if not stats.chunk_sizes:
+                continue
+            total = 0
+            for bound, count in sorted(stats.chunk_sizes.items()):
+                total += count
+                lines.append(f'chunked_chunk_size_bucket{{{_labels(stats)},le="{bound}"}} {total}')
+            lines.append(f'chunked_chunk_size_bucket{{{_labels(stats)},le="+Inf"}} {total}')
+            lines.append(f'chunked_chunk_size_sum{{{_labels(stats)}}} {stats.chunk_size_sum}')
+            lines.append(f'chunked_chunk_size_count{{{_labels(stats)}}} {total}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write(self.to_prometheus() if path.endswith('.prom') else self.to_json(indent=2))
+
+
+def _labels(stats):
+    site = stats.site.replace('\\', '\\\\').replace('"', '\\"')
+    return f'function="{stats.function}",site="{site}"'
+
+
+class _TimedSource:
+    __slots__ = ('_iterator', '_stats')
+
+    def __init__(self, iterator, stats):
+        self._iterator = iterator
+        self._stats = stats
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = perf_counter()
+        try:
+            return next(self._iterator)
+        finally:
+            self._stats.upstream_seconds += perf_counter() - start
+
+
+class _ProfiledIterator:
+    __slots__ = ('_iterator', '_stats', '_chunks')
+
+    def __init__(self, iterator, stats, chunks):
+        self._iterator = iterator
+        self._stats = stats
+        self._chunks = chunks
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = perf_counter()
+        try:
+            item = next(self._iterator)
+        finally:
+            self._stats.seconds += perf_counter() - start
+        self._stats.items += 1
+        if self._chunks:
+            try:
+                self._stats.record_chunk(len(item))
+            except TypeError:
+                pass
+        return item
+
+    def __getattr__(self, name):
+        return getattr(self._iterator, name)
+
+
+def _is_plain_iterator(obj):
+    return (
+        hasattr(type(obj), '__next__')
+        and not isinstance(obj, (IOBase, chunked.seekable, chunked.mmap))
+    )
+
+
+def _has_own_implementation(name, obj):
+    # Wrapping an iterable that register() gave its own implementation
+    # would hide its type from the dispatch and fall back to the generic one.
+    dispatcher = chunked._DISPATCH.get(name)
+    return dispatcher is not None and dispatcher[type(obj)] is not dispatcher[object]
+
+
+def _wrap(name, func, profile):
+    chunks = name in CHUNKING
+    internal = {chunked.__file__, __file__}
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        caller = sys._getframe(1)
+        if caller.f_code.co_filename in internal:
+            return func(*args, **kwargs)
+        stats = profile.site(name, caller.f_code.co_filename, caller.f_lineno)
+        args = [
+            _TimedSource(arg, stats)
+            if _is_plain_iterator(arg) and not (i == 0 and _has_own_implementation(name, arg))
+            else arg
+            for i, arg in enumerate(args)
+        ]
+        start = perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            stats.seconds += perf_counter() - start
+            stats.calls += 1
+        if hasattr(type(result), '__next__'):
+            return _ProfiledIterator(result, stats, chunks)
+        return result
+
+    return wrapper
+
+
+def profiled_names():
+    return sorted(
+        name for name, obj in vars(chunked).items()
+        if not name.startswith('_') and name not in NOT_PROFILED
+        and (isfunction(obj) and obj.__module__ == chunked.__name__ or name == 'time_limited')
+    )
+
+
+def enable(profile=None):
+    '''Start profiling into *profile* (a new :class:`Profile` by default) and return it.'''
+    global _active
+    if _active is not None:
+        raise RuntimeError('profiling is already enabled')
+    _active = profile if profile is not None else Profile()
+    for name in profiled_names():
+        _originals[name] = getattr(chunked, name)
+        setattr(chunked, name, _wrap(name, _originals[name], _active))
+    return _active
+
+
+def disable():
+    '''Stop profiling, restore the original functions and return the profile.'''
+    global _active
+    for name, func in _originals.items():
+        setattr(chunked, name, func)
+    _originals.clear()
+    profile, _active = _active, None
+    return profile
+
+
+def active():
+    return _active
+
+
+@contextmanager
+def profiling(profile=None):
+    '''
+        Profile the ``chunked`` calls made inside the block. If profiling
+        is already on, the active profile is used and left running.
+    '''
+    if _active is not None:
+        yield _active
+        return
+    profile = enable(profile)
+    try:
+        yield profile
+    finally:
+        disable()
+
+
+def _enable_from_environment():
+    profile = enable()
+    output = os.environ.get('CHUNKED_PROFILE_OUTPUT')
+    if output:
+        import atexit
+        atexit.register(profile.write, output)
@@ -1,17 +1,176 @@
+from itertools import islice, repeat
+
 
 class Person:
+    __slots__ = ('fname', 'lname')
+
     def __init__(self, fname, lname):
         self.fname = fname
         self.lname = lname
 
     def full_name(self):
-        return f'{self.fname} {self.lname}'
+        return _full_name(self.fname, self.lname)
 
     def email(self):
-        return f'{self.full_name()}@email.com'.replace(' ', '')
+        return _email(self.fname, self.lname)
+
+
+def _full_name(fname, lname):
+    return f'{fname} {lname}'
+
+
+def _email(fname, lname):
+    return f'{fname}{lname}@email.com'.replace(' ', '')
+
+
+def _full_names(fnames, lnames):
+    return [f'{fname} {lname}' for fname, lname in zip(fnames, lnames)]
+
+
+def _emails(fnames, lnames):
+    return [f'{fname}{lname}@email.com'.replace(' ', '') for fname, lname in zip(fnames, lnames)]
+
+
+_COLUMNS = {'full_name': (_full_name, _full_names), 'email': (_email, _emails)}
+
+
+class PersonRow:
+    '''A view of one row of a :class:`PersonTable` that behaves like a :class:`Person`.'''
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    @property
+    def fname(self):
+        return self._table.fnames[self._index]
+
+    @fname.setter
+    def fname(self, value):
+        self._table.update(self._index, fname=value)
+
+    @property
+    def lname(self):
+        return self._table.lnames[self._index]
+
+    @lname.setter
+    def lname(self, value):
+        self._table.update(self._index, lname=value)
+
+    def full_name(self):
+        return self._table.full_name(self._index)
+
+    def email(self):
+        return self._table.email(self._index)
+
+    def to_person(self):
+        return Person(self.fname, self.lname)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.fname!r}, {self.lname!r})'
+
+
+class PersonTable:
+    '''
+        People stored column by column, with ``full_name`` and ``email``
+        computed for every row at once:
+            table = PersonTable(['saman', 'artin'], ['amini', 'amini'])
+            table.emails()
+            ['samanamini@email.com', 'artinamini@email.com']
+            table[1].full_name()
+            'artin amini'
+        With *cache* the computed columns are kept, and extended or
+        recomputed only for rows that were appended or updated since.
+        The lists returned by :meth:`full_names` and :meth:`emails` are
+        then shared with the table and must not be modified. Rows must be
+        changed through :meth:`update` (or a row view) so the cache sees it.
+    '''
+
+    def __init__(self, fnames=(), lnames=(), cache=False):
+        self.fnames = list(fnames)
+        self.lnames = list(lnames)
+        if len(self.fnames) != len(self.lnames):
+            raise ValueError('fnames and lnames must have the same length')
+        self._cache = cache
+        self._columns = {}
+        self._stale = set()
+
+    @classmethod
+    def from_people(cls, people, cache=False):
+        table = cls(cache=cache)
+        table.extend(people)
+        return table
+
+    def __len__(self):
+        return len(self.fnames)
+
+    def __getitem__(self, index):
+        rows = range(len(self.fnames))[index]
+        if isinstance(rows, range):
+            return list(map(PersonRow, repeat(self), rows))
+        return PersonRow(self, rows)
+
+    def __iter__(self):
+        return map(PersonRow, repeat(self), range(len(self.fnames)))
+
+    def append(self, fname, lname):
+        self.fnames.append(fname)
+        self.lnames.append(lname)
+
+    def extend(self, people):
+        for person in people:
+            self.fnames.append(person.fname)
+            self.lnames.append(person.lname)
+
+    def update(self, index, fname=None, lname=None):
+        index = range(len(self.fnames))[index]
+        if fname is not None:
+            self.fnames[index] = fname
+        if lname is not None:
+            self.lnames[index] = lname
+        if self._columns:
+            self._stale.add(index)
+
+    def _column(self, name):
+        bulk = _COLUMNS[name][1]
+        if not self._cache:
+            return bulk(self.fnames, self.lnames)
+        if self._stale:
+            for column_name, column in self._columns.items():
+                function = _COLUMNS[column_name][0]
+                for i in self._stale:
+                    if i < len(column):
+                        column[i] = function(self.fnames[i], self.lnames[i])
+            self._stale.clear()
+        column = self._columns.setdefault(name, [])
+        start = len(column)
+        if start < len(self.fnames):
+            column.extend(bulk(islice(self.fnames, start, None), islice(self.lnames, start, None)))
+        return column
+
+    def _cached(self, name, index):
+        index = range(len(self.fnames))[index]
+        column = self._columns.get(name)
+        if column is not None and index < len(column) and index not in self._stale:
+            return column[index]
+        return _COLUMNS[name][0](self.fnames[index], self.lnames[index])
+
+    def full_names(self):
+        return self._column('full_name')
+
+    def emails(self):
+        return self._column('email')
+
+    def full_name(self, index):
+        return self._cached('full_name', index)
+
+    def email(self, index):
+        return self._cached('email', index)
 
 
-p1 = Person('saman', 'amini')
+if __name__ == '__main__':
+    p1 = Person('saman', 'amini')
 
-print(p1.full_name())
-print(p1.email())
+    print(p1.full_name())
+    print(p1.email())
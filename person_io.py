@@ -0,0 +1,152 @@
+'''
+    Streaming CSV and JSON Lines input and output for :class:`person.Person`.
+        stats = Throughput()
+        for batch in read_people('people.csv', batch_size=10_000, stats=stats):
+            ...
+        write_people('emails.jsonl', read_people('people.csv'), columns=('email',))
+    Files are read and written through large buffers, one batch of rows at
+    a time, so memory stays bounded by the batch size whatever the file
+    size. The format comes from the file suffix (``.csv``, ``.jsonl`` or
+    ``.ndjson``) unless *format* is given. CSV files must have a header
+    with ``fname`` and ``lname`` columns; JSON Lines records are objects
+    with those keys.
+'''
+import csv
+import json
+import os
+from itertools import starmap
+from operator import itemgetter
+from time import monotonic
+
+from chunked import chunked
+from person import Person, PersonTable
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+COLUMNS = ('fname', 'lname', 'full_name', 'email')
+_BLOCK_SIZE = 1 << 20
+_BATCH_SIZE = 1 << 14
+
+
+class Throughput:
+    '''Rows, bytes and elapsed seconds of a read or write, updated after each batch.'''
+    __slots__ = ('rows', 'bytes', 'seconds')
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_sec(self):
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(rows={self.rows}, bytes={self.bytes}, '
+                f'seconds={self.seconds:.3f}, rows_per_sec={self.rows_per_sec:,.0f})')
+
+
+def _format(path, format):
+    if format is None:
+        format = FORMATS.get(os.path.splitext(os.fspath(path))[1].lower())
+        if format is None:
+            raise ValueError(f'cannot tell the format of {path!r}, pass format=')
+    elif format not in ('csv', 'jsonl'):
+        raise ValueError(f'unknown format {format!r}')
+    return format
+
+
+def _csv_records(f):
+    rows = csv.reader(f)
+    header = next(rows, None)
+    if header is None:
+        return iter(())
+    try:
+        getter = itemgetter(header.index('fname'), header.index('lname'))
+    except ValueError:
+        raise ValueError(f'{f.name}: header must have fname and lname columns') from None
+    return map(getter, rows)
+
+
+def _jsonl_records(f):
+    return map(itemgetter('fname', 'lname'), map(json.loads, filter(str.strip, f)))
+
+
+_READERS = {'csv': _csv_records, 'jsonl': _jsonl_records}
+
+
+def read_people(path, format=None, batch_size=None, stats=None, block_size=_BLOCK_SIZE):
+    '''
+        Yield a :class:`Person` for each row of the file at *path*, or
+        lists of up to *batch_size* of them. *stats*, a :class:`Throughput`,
+        is updated as batches are read.
+    '''
+    format = _format(path, format)
+    if batch_size is not None and batch_size < 1:
+        raise ValueError('batch_size must be at least 1')
+    return _read_people(path, format, batch_size, stats, block_size)
+
+
+def _read_people(path, format, batch_size, stats, block_size):
+    start = monotonic()
+    with open(path, newline='', encoding='utf-8', buffering=block_size) as f:
+        people = starmap(Person, _READERS[format](f))
+        for batch in chunked(people, batch_size or _BATCH_SIZE):
+            if stats is not None:
+                stats.rows += len(batch)
+                stats.bytes = f.buffer.tell()
+                stats.seconds = monotonic() - start
+            if batch_size is None:
+                yield from batch
+            else:
+                yield batch
+
+
+def _columns(table, columns):
+    values = []
+    for column in columns:
+        if column == 'fname':
+            values.append(table.fnames)
+        elif column == 'lname':
+            values.append(table.lnames)
+        elif column == 'full_name':
+            values.append(table.full_names())
+        else:
+            values.append(table.emails())
+    return values
+
+
+def write_people(path, people, columns=COLUMNS, format=None, batch_size=_BATCH_SIZE, stats=None,
+                 block_size=_BLOCK_SIZE):
+    '''
+        Write *people* (``Person``-like objects, or a :class:`PersonTable`)
+        to *path*, one row per person with the given *columns*. Rows are
+        collected into a :class:`PersonTable` *batch_size* at a time, so
+        ``full_name`` and ``email`` are computed per batch, and each batch
+        goes out in a single write. Return a :class:`Throughput`.
+    '''
+    format = _format(path, format)
+    unknown = set(columns) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown columns: {', '.join(sorted(unknown))}")
+    stats = stats if stats is not None else Throughput()
+    start = monotonic()
+    with open(path, 'w', newline='', encoding='utf-8', buffering=block_size) as f:
+        if format == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(columns)
+        for batch in chunked(people, batch_size):
+            rows = zip(*_columns(PersonTable.from_people(batch), columns))
+            if format == 'csv':
+                writer.writerows(rows)
+            else:
+                f.write(''.join(
+                    json.dumps(dict(zip(columns, row))) + '\n' for row in rows
+                ))
+            stats.rows += len(batch)
+            stats.bytes = f.tell()
+            stats.seconds = monotonic() - start
+    return stats
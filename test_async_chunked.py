@@ -0,0 +1,172 @@
+import asyncio
+import traceback
+from itertools import count
+from operator import add
+from unittest import IsolatedAsyncioTestCase
+
+import async_chunked
+
+
+async def agen(iterable, delay=0):
+    for item in iterable:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def alist(aiterable):
+    return [item async for item in aiterable]
+
+
+class ChunkedTests(IsolatedAsyncioTestCase):
+    async def test_odd(self):
+        actual = await alist(async_chunked.chunked(agen('ABCDE'), 3))
+        self.assertEqual(actual, [['A', 'B', 'C'], ['D', 'E']])
+
+    async def test_none(self):
+        actual = await alist(async_chunked.chunked(agen('ABCDE'), None))
+        self.assertEqual(actual, [['A', 'B', 'C', 'D', 'E']])
+
+    async def test_strict(self):
+        with self.assertRaisesRegex(ValueError, 'iterator is not divisible by n'):
+            await alist(async_chunked.chunked(agen('ABCDE'), 3, strict=True))
+        with self.assertRaisesRegex(ValueError, 'n cant be none when strict is True'):
+            await alist(async_chunked.chunked(agen('ABCDE'), None, strict=True))
+
+    async def test_sync_iterable(self):
+        actual = await alist(async_chunked.chunked(range(4), 2))
+        self.assertEqual(actual, [[0, 1], [2, 3]])
+
+
+class FirstLastTests(IsolatedAsyncioTestCase):
+    async def test_first(self):
+        self.assertEqual(await async_chunked.first(agen(range(4))), 0)
+        self.assertEqual(await async_chunked.first(agen([]), 'boo'), 'boo')
+
+    async def test_first_empty(self):
+        try:
+            await async_chunked.first(agen([]))
+        except ValueError:
+            formatted_exc = traceback.format_exc()
+            self.assertIn('StopAsyncIteration', formatted_exc)
+            self.assertIn('The above exception was the direct cause ', formatted_exc)
+        else:
+            self.fail()
+
+    async def test_last(self):
+        self.assertEqual(await async_chunked.last(agen(range(4))), 3)
+        self.assertEqual(await async_chunked.last(agen([]), None), None)
+        with self.assertRaises(ValueError):
+            await async_chunked.last(agen([]))
+
+
+class OneOnlyTests(IsolatedAsyncioTestCase):
+    async def test_one(self):
+        self.assertEqual(await async_chunked.one(agen(['item'])), 'item')
+        with self.assertRaises(IndexError):
+            await async_chunked.one(agen([]), too_short=IndexError)
+        with self.assertRaisesRegex(ValueError, 'but got 0, 1 and perhaps more'):
+            await async_chunked.one(agen(count()))
+
+    async def test_only(self):
+        self.assertEqual(await async_chunked.only(agen([])), None)
+        self.assertEqual(await async_chunked.only(agen([1]), default='!'), 1)
+        with self.assertRaises(RuntimeError):
+            await async_chunked.only(agen([1, 2]), too_lang=RuntimeError)
+
+
+class StrictlyNTests(IsolatedAsyncioTestCase):
+    async def test_basic(self):
+        self.assertEqual(await alist(async_chunked.strictly_n(agen('ABCD'), 4)), list('ABCD'))
+
+    async def test_too_short(self):
+        with self.assertRaisesRegex(ValueError, r'Too few items in iterable \( got 4 \)'):
+            await alist(async_chunked.strictly_n(agen('ABCD'), 5))
+
+    async def test_too_long(self):
+        with self.assertRaisesRegex(ValueError, r'Too many items in iterable \( at least 4\)'):
+            await alist(async_chunked.strictly_n(agen('ABCD'), 3))
+
+
+class SplitTests(IsolatedAsyncioTestCase):
+    async def test_split_after(self):
+        for max_split, expected in [
+            (-1, [['a', ','], ['b', ','], ['c', ','], ['d']]),
+            (0, [['a', ',', 'b', ',', 'c', ',', 'd']]),
+            (1, [['a', ','], ['b', ',', 'c', ',', 'd']]),
+            (2, [['a', ','], ['b', ','], ['c', ',', 'd']]),
+        ]:
+            with self.subTest(max_split=max_split):
+                actual = await alist(async_chunked.split_after(agen('a,b,c,d'), lambda c: c == ',', max_split))
+                self.assertEqual(actual, expected)
+
+    async def test_split_into(self):
+        actual = await alist(async_chunked.split_into(agen(range(1, 10)), [2, 3, None, 4]))
+        self.assertEqual(actual, [[1, 2], [3, 4, 5], [6, 7, 8, 9]])
+        actual = await alist(async_chunked.split_into(agen([1, 2, 3]), [2, 4, 1]))
+        self.assertEqual(actual, [[1, 2], [3], []])
+
+    async def test_split_into_invalid(self):
+        with self.assertRaises(ValueError):
+            await alist(async_chunked.split_into(agen(range(9)), [1, [], 3]))
+
+
+class MapIfTests(IsolatedAsyncioTestCase):
+    async def test_sync_func(self):
+        actual = await alist(async_chunked.map_if(agen(range(-2, 3)), lambda x: x >= 0, lambda x: 'notneg', lambda x: 'neg'))
+        self.assertEqual(actual, ['neg', 'neg', 'notneg', 'notneg', 'notneg'])
+
+    async def test_async_func(self):
+        async def double(x):
+            await asyncio.sleep(0)
+            return x * 2
+
+        actual = await alist(async_chunked.map_if(agen(range(4)), lambda x: x % 2, double))
+        self.assertEqual(actual, [0, 2, 2, 6])
+
+
+class InterleaveTests(IsolatedAsyncioTestCase):
+    async def test_short(self):
+        actual = await alist(async_chunked.interleave(agen([1, 4]), agen([2, 5, 7]), [3, 6, 8]))
+        self.assertEqual(actual, [1, 2, 3, 4, 5, 6])
+
+
+class DifferenceTests(IsolatedAsyncioTestCase):
+    async def test_normal(self):
+        self.assertEqual(await alist(async_chunked.difference(agen([10, 20, 30]))), [10, 10, 10])
+        self.assertEqual(await alist(async_chunked.difference(agen([10, 20, 30]), add)), [10, 30, 50])
+        self.assertEqual(await alist(async_chunked.difference(agen([]))), [])
+
+    async def test_initial(self):
+        actual = await alist(async_chunked.difference(agen([100, 100, 101, 103]), initial=100))
+        self.assertEqual(actual, [0, 1, 2])
+
+
+class TimeLimitedTests(IsolatedAsyncioTestCase):
+    async def test_blocked_producer(self):
+        async def generator():
+            yield 1
+            yield 2
+            await asyncio.sleep(5)
+            yield 3
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        iterable = async_chunked.time_limited(0.1, generator())
+        self.assertEqual(await alist(iterable), [1, 2])
+        self.assertTrue(iterable.timed_out)
+        self.assertLess(loop.time() - start, 1)
+
+    async def test_complete(self):
+        iterable = async_chunked.time_limited(2, agen(range(10)))
+        self.assertEqual(await alist(iterable), list(range(10)))
+        self.assertFalse(iterable.timed_out)
+
+    async def test_zero_limit(self):
+        iterable = async_chunked.time_limited(0, agen(count()))
+        self.assertEqual(await alist(iterable), [])
+        self.assertTrue(iterable.timed_out)
+
+    def test_invalid_limit(self):
+        with self.assertRaises(ValueError):
+            async_chunked.time_limited(-0.1, agen(count()))
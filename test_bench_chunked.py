@@ -0,0 +1,59 @@
+import json
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import bench_chunked
+
+
+class CoverageTests(TestCase):
+    def test_every_public_function_has_a_case(self):
+        missing = set(bench_chunked.public_functions()) - set(bench_chunked.CASES)
+        self.assertEqual(missing, set())
+
+    def test_cases_run(self):
+        results = bench_chunked.run(list(bench_chunked.CASES), list(bench_chunked.KINDS), [10], repeat=1)
+        self.assertIn('chunked/generator/10', results)
+        self.assertNotIn('SequenceView/generator/10', results)
+        for key, result in results.items():
+            with self.subTest(key=key):
+                self.assertGreater(result['items_per_sec'], 0)
+                self.assertGreaterEqual(result['peak_bytes'], 0)
+
+
+class CompareTests(TestCase):
+    baseline = {
+        'chunked/list/10': {'items_per_sec': 1000.0, 'peak_bytes': 10_000, 'seconds': 0.01},
+        'first/list/10': {'items_per_sec': 1000.0, 'peak_bytes': 10_000, 'seconds': 0.01},
+    }
+
+    def test_within_threshold(self):
+        results = {
+            'chunked/list/10': {'items_per_sec': 900.0, 'peak_bytes': 11_000, 'seconds': 0.011},
+            'last/list/10': {'items_per_sec': 1.0, 'peak_bytes': 10 ** 9, 'seconds': 10},
+        }
+        self.assertEqual(bench_chunked.compare(results, self.baseline, 0.2), [])
+
+    def test_regressions(self):
+        results = {
+            'chunked/list/10': {'items_per_sec': 500.0, 'peak_bytes': 10_000, 'seconds': 0.02},
+            'first/list/10': {'items_per_sec': 1000.0, 'peak_bytes': 50_000, 'seconds': 0.01},
+        }
+        actual = bench_chunked.compare(results, self.baseline, 0.2)
+        expected = [
+            ('chunked/list/10', 'items_per_sec', 1000.0, 500.0),
+            ('first/list/10', 'peak_bytes', 10_000, 50_000),
+        ]
+        self.assertEqual(actual, expected)
+
+    def test_main_exit_status(self):
+        with TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            args = ['--only', 'chunked', '--kinds', 'list', '--sizes', '10', '--repeat', '1']
+            self.assertEqual(bench_chunked.main(args + ['--output', path]), 0)
+            with open(path) as f:
+                saved = json.load(f)
+            saved['results']['chunked/list/10']['items_per_sec'] = float('inf')
+            with open(path, 'w') as f:
+                json.dump(saved, f)
+            self.assertEqual(bench_chunked.main(args + ['--baseline', path]), 1)
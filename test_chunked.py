@@ -1,10 +1,28 @@
+import os
+import subprocess
+import sys
+import threading
 import traceback
-from itertools import count, cycle, accumulate
+import weakref
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO, BytesIO
+from mmap import mmap, ACCESS_READ
+from tempfile import TemporaryFile, TemporaryDirectory
+from itertools import count, cycle, accumulate, chain
+from collections import deque
+from collections.abc import Sequence
 from unittest import TestCase, skipIf
-from time import sleep
-from operator import add
+from time import sleep, monotonic
+from threading import Event, Thread
+from operator import add, truediv
 from sys import version_info
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 import chunked
 
 
@@ -52,6 +70,97 @@ class ChunkTests(TestCase):
         self.assertRaisesRegex(ValueError, 'n cant be none when strict is True', f)
 
 
+class ChunkZeroCopyTests(TestCase):
+    def test_bytes(self):
+        actual = list(chunked.chunked(b'ABCDE', 2, zero_copy=True))
+        self.assertTrue(all(isinstance(chunk, memoryview) for chunk in actual))
+        self.assertEqual([bytes(chunk) for chunk in actual], [b'AB', b'CD', b'E'])
+
+    def test_shares_memory(self):
+        data = bytearray(b'ABCDEF')
+        first_chunk = next(chunked.chunked(data, 3, zero_copy=True))
+        data[0] = ord('Z')
+        self.assertEqual(bytes(first_chunk), b'ZBC')
+
+    def test_array(self):
+        data = array('i', range(7))
+        actual = [chunk.tolist() for chunk in chunked.chunked(data, 3, zero_copy=True)]
+        self.assertEqual(actual, [[0, 1, 2], [3, 4, 5], [6]])
+
+    def test_mmap(self):
+        with TemporaryFile() as f:
+            f.write(b'ABCDEFG')
+            f.flush()
+            with mmap(f.fileno(), 0) as mm:
+                chunks = chunked.chunked(mm, 4, zero_copy=True)
+                self.assertEqual([bytes(chunk) for chunk in chunks], [b'ABCD', b'EFG'])
+                del chunks
+
+    def test_sequence(self):
+        self.assertEqual(list(chunked.chunked([1, 2, 3, 4, 5], 2, zero_copy=True)), [[1, 2], [3, 4], [5]])
+        self.assertEqual(list(chunked.chunked('ABCDE', 3, zero_copy=True)), ['ABC', 'DE'])
+        self.assertEqual(list(chunked.chunked(range(5), None, zero_copy=True)), [range(5)])
+        self.assertEqual(list(chunked.chunked([], 3, zero_copy=True)), [])
+
+    def test_strict(self):
+        for iterable in (b'ABCDE', [1, 2, 3, 4, 5]):
+            with self.subTest(iterable=iterable):
+                it = chunked.chunked(iterable, 3, strict=True, zero_copy=True)
+                self.assertEqual(len(next(it)), 3)
+                self.assertRaisesRegex(ValueError, 'iterator is not divisible by n', lambda: next(it))
+        self.assertEqual(len(list(chunked.chunked(b'ABCDEF', 3, strict=True, zero_copy=True))), 2)
+
+    def test_invalid_n(self):
+        for iterable in (b'abc', [1, 2, 3], 'abc'):
+            for n in (-1, 1.5):
+                with self.subTest(iterable=iterable, n=n):
+                    with self.assertRaisesRegex(ValueError, 'islice'):
+                        list(chunked.chunked(iterable, n, zero_copy=True))
+
+    def test_fallback(self):
+        actual = list(chunked.chunked(iter('ABCDE'), 3, zero_copy=True))
+        self.assertEqual(actual, [['A', 'B', 'C'], ['D', 'E']])
+
+
+class ConstrainedBatchesTests(TestCase):
+    def test_size(self):
+        iterable = [b'12345', b'123', b'12345678', b'1', b'1', b'12', b'1']
+        actual = list(chunked.constrained_batches(iterable, 10))
+        expected = [[b'12345', b'123'], [b'12345678', b'1', b'1'], [b'12', b'1']]
+        self.assertEqual(actual, expected)
+
+    def test_count(self):
+        iterable = [b'12345', b'123', b'12345678', b'1', b'1', b'12', b'1']
+        actual = list(chunked.constrained_batches(iterable, 10, max_count=2))
+        expected = [[b'12345', b'123'], [b'12345678', b'1'], [b'1', b'12'], [b'1']]
+        self.assertEqual(actual, expected)
+
+    def test_get_len(self):
+        calls = []
+
+        def weight(item):
+            calls.append(item)
+            return item
+
+        actual = list(chunked.constrained_batches([3, 4, 2, 5, 1], 6, get_len=weight))
+        self.assertEqual(actual, [[3], [4, 2], [5, 1]])
+        self.assertEqual(calls, [3, 4, 2, 5, 1])
+
+    def test_oversized(self):
+        iterable = ['ab', 'abcdef', 'a']
+        with self.assertRaises(ValueError):
+            list(chunked.constrained_batches(iterable, 4))
+        actual = list(chunked.constrained_batches(iterable, 4, strict=False))
+        self.assertEqual(actual, [['ab'], ['abcdef'], ['a']])
+
+    def test_empty(self):
+        self.assertEqual(list(chunked.constrained_batches([], 10)), [])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, lambda: chunked.constrained_batches([], 0))
+        self.assertRaises(ValueError, lambda: chunked.constrained_batches([], 10, max_count=0))
+
+
 class FirstTests(TestCase):
     def test_many(self):
         self.assertEqual(chunked.first(x for x in range(4)), 0)
@@ -171,6 +280,40 @@ class InterleaveTests(TestCase):
         self.assertEqual(actual, expected)
 
 
+class InterleaveLongestTests(TestCase):
+    def test_uneven(self):
+        actual = list(chunked.interleave_longest([1, 4, 7], [2, 5], [3, 6, 8, 9]))
+        self.assertEqual(actual, [1, 2, 3, 4, 5, 6, 7, 8, 9])
+
+    def test_empty(self):
+        self.assertEqual(list(chunked.interleave_longest()), [])
+        self.assertEqual(list(chunked.interleave_longest([], 'ab', [])), ['a', 'b'])
+
+    def test_many_sources(self):
+        sources = [range(i) for i in range(200)]
+        actual = list(chunked.roundrobin(*sources))
+        self.assertEqual(sorted(actual), sorted(chain.from_iterable(sources)))
+        self.assertEqual(actual[:3], [0, 0, 0])
+        self.assertEqual(actual[-1], 198)
+
+
+class RoundRobinTests(TestCase):
+    def test_basic(self):
+        self.assertEqual(list(chunked.roundrobin('ABC', 'D', 'EF')), list('ADEBFC'))
+
+    def test_weighted(self):
+        actual = list(chunked.roundrobin('ABCDE', 'xy', 'z', weights=[2, 1, 3]))
+        self.assertEqual(actual, list('ABxzCDyE'))
+
+    def test_weighted_infinite(self):
+        actual = chunked.take(chunked.roundrobin(count(), 'ab', weights=[3, 1]), 10)
+        self.assertEqual(actual, [0, 1, 2, 'a', 3, 4, 5, 'b', 6, 7])
+
+    def test_invalid_weights(self):
+        self.assertRaises(ValueError, lambda: chunked.roundrobin('a', 'b', weights=[1]))
+        self.assertRaises(ValueError, lambda: chunked.roundrobin('a', weights=[0]))
+
+
 class RepeatEachTests(TestCase):
     def test_default(self):
         actual = chunked.repeat_each('ABC')
@@ -204,6 +347,20 @@ class RepeatEachTests(TestCase):
     #     self.assertEqual(actual, expected)
 
 
+class IRepeatEachTests(TestCase):
+    def test_basic(self):
+        actual = chunked.irepeat_each('ABC', 3)
+        self.assertNotIsInstance(actual, list)
+        self.assertEqual(list(actual), ['A', 'A', 'A', 'B', 'B', 'B', 'C', 'C', 'C'])
+        self.assertEqual(list(chunked.irepeat_each('ABC', -1)), [])
+
+    def test_infinite_repeat(self):
+        repeater = chunked.irepeat_each(cycle('AB'))
+        actual = chunked.take(repeater, 6)
+        expected = ['A', 'A', 'B', 'B', 'A', 'A']
+        self.assertEqual(actual, expected)
+
+
 class StrictlyNTests(TestCase):
     def test_basic(self):
         iterable = ['A', 'B', 'C', 'D']
@@ -300,6 +457,15 @@ class AlwaysReversibleTests(TestCase):
             reversed((1, 2)).__class__, chunked.always_reversible(x for x in (1, 2)).__class__
         )
 
+    def test_budget(self):
+        for size in (0, 1, 3, 9, 10):
+            with self.subTest(size=size):
+                actual = chunked.always_reversible((x for x in range(size)), budget=3)
+                self.assertEqual(list(actual), list(reversed(range(size))))
+        self.assertEqual(list(chunked.always_reversible([1, 2], budget=1)), [2, 1])
+        with self.assertRaises(ValueError):
+            chunked.always_reversible([1, 2], budget=0)
+
 
 class AlwaysIterableTests(TestCase):
     def test_single(self):
@@ -400,6 +566,58 @@ class SplitAfterTests(TestCase):
             self.assertEqual(actual, expected)
 
 
+class SplitAfterBytesTests(TestCase):
+    def split(self, data, *args, **kwargs):
+        return [bytes(record) for record in chunked.split_after_bytes(BytesIO(data), *args, **kwargs)]
+
+    def test_basic(self):
+        self.assertEqual(self.split(b'ab\ncd\n'), [b'ab\n', b'cd\n'])
+        self.assertEqual(self.split(b'\nab\ncd'), [b'\n', b'ab\n', b'cd'])
+        self.assertEqual(self.split(b''), [])
+        self.assertEqual(self.split(b'abc'), [b'abc'])
+
+    def test_matches_split_after(self):
+        data = b'a,b,,c,d'
+        for max_split in (-1, 0, 1, 2, 10):
+            for buffer_size in (1, 2, 3, 1024):
+                with self.subTest(max_split=max_split, buffer_size=buffer_size):
+                    expected = [bytes(chunk) for chunk in chunked.split_after(data, lambda c: c == ord(','), max_split)]
+                    self.assertEqual(self.split(data, b',', max_split, buffer_size), expected)
+
+    def test_multibyte_delimiter_across_reads(self):
+        data = b'one\r\ntwo\r\n\r\nthree'
+        for buffer_size in range(1, 12):
+            with self.subTest(buffer_size=buffer_size):
+                self.assertEqual(self.split(data, b'\r\n', buffer_size=buffer_size),
+                                 [b'one\r\n', b'two\r\n', b'\r\n', b'three'])
+
+    def test_long_records(self):
+        data = b'x' * 10000 + b'\n' + b'y' * 5 + b'\n' + b'z' * 3000
+        self.assertEqual(self.split(data, buffer_size=16), [b'x' * 10000 + b'\n', b'y' * 5 + b'\n', b'z' * 3000])
+
+    def test_views(self):
+        records = chunked.split_after_bytes(BytesIO(b'ab\ncd'), copy=False)
+        record = next(records)
+        self.assertIsInstance(record, memoryview)
+        self.assertEqual(record.tobytes(), b'ab\n')
+        self.assertEqual(bytes(next(records)), b'cd')
+
+    def test_file_without_readinto(self):
+        class Reader:
+            def __init__(self, data):
+                self._stream = BytesIO(data)
+
+            def read(self, size=-1):
+                return self._stream.read(size)
+
+        records = chunked.split_after_bytes(Reader(b'a\nb\nc'), max_split=1, buffer_size=2)
+        self.assertEqual(list(records), [b'a\n', b'b\nc'])
+
+    def test_empty_delimiter(self):
+        with self.assertRaises(ValueError):
+            list(chunked.split_after_bytes(BytesIO(b'abc'), b''))
+
+
 class SpiltIntoTests(TestCase):
     def test_iterable_just_right(self):
         iterable = [1, 2, 3, 4, 5, 6, 7, 8, 9]
@@ -540,6 +758,95 @@ class MapIfTests(TestCase):
         self.assertEqual(actual, expected)
 
 
+def _is_odd(x):
+    return x % 2
+
+
+def _square(x):
+    return x * x
+
+
+def _fail_on_seven(x):
+    if x == 7:
+        raise KeyError(x)
+    return x
+
+
+def _double_chunk(chunk):
+    return [2 * x for x in chunk]
+
+
+def _upper_chunk(chunk):
+    return bytes(chunk).upper()
+
+
+def _short_chunk(chunk):
+    return chunk[1:]
+
+
+class MapIfParallelTests(TestCase):
+    def test_ordered(self):
+        iterable = range(-50, 50)
+        expected = list(chunked.map_if(iterable, lambda x: x > 3, lambda x: 'too big'))
+        actual = list(chunked.map_if_parallel(iterable, lambda x: x > 3, lambda x: 'too big', batch_size=7))
+        self.assertEqual(actual, expected)
+
+    def test_func_else(self):
+        actual = list(chunked.map_if_parallel(range(-2, 2), lambda x: x >= 0, lambda x: 'notneg', lambda x: 'neg'))
+        self.assertEqual(actual, ['neg', 'neg', 'notneg', 'notneg'])
+
+    def test_empty(self):
+        self.assertEqual(list(chunked.map_if_parallel([], _is_odd, _square)), [])
+
+    def test_unordered(self):
+        def slow_first(x):
+            if x < 4:
+                sleep(0.1)
+            return x
+
+        actual = list(chunked.map_if_parallel(
+            range(40), lambda x: True, slow_first, batch_size=4, max_workers=4, ordered=False
+        ))
+        self.assertEqual(sorted(actual), list(range(40)))
+        self.assertNotEqual(actual[:4], [0, 1, 2, 3])
+
+    def test_exception_position(self):
+        actual = []
+        with self.assertRaises(KeyError):
+            for item in chunked.map_if_parallel(range(20), lambda x: True, _fail_on_seven, batch_size=5):
+                actual.append(item)
+        self.assertEqual(actual, [0, 1, 2, 3, 4, 5, 6])
+
+    def test_max_in_flight(self):
+        pulled = []
+
+        def source():
+            for i in range(100):
+                pulled.append(i)
+                yield i
+
+        it = chunked.map_if_parallel(source(), _is_odd, _square, batch_size=5, max_in_flight=10)
+        self.assertEqual(next(it), 0)
+        self.assertLessEqual(len(pulled), 10)
+        it.close()
+        with self.assertRaisesRegex(ValueError, 'max_in_flight'):
+            chunked.map_if_parallel(range(10), _is_odd, _square, batch_size=5, max_in_flight=4)
+
+    def test_process_pool(self):
+        actual = list(chunked.map_if_parallel(range(30), _is_odd, _square, executor='process', max_workers=2))
+        self.assertEqual(actual, list(chunked.map_if(range(30), _is_odd, _square)))
+
+    def test_external_executor(self):
+        with ThreadPoolExecutor(2) as pool:
+            actual = list(chunked.map_if_parallel(range(10), _is_odd, _square, executor=pool))
+            self.assertEqual(actual, [0, 1, 2, 9, 4, 25, 6, 49, 8, 81])
+            self.assertEqual(pool.submit(_square, 3).result(), 9)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, lambda: chunked.map_if_parallel([], _is_odd, _square, executor='fiber'))
+        self.assertRaises(ValueError, lambda: chunked.map_if_parallel([], _is_odd, _square, batch_size=0))
+
+
 class TimeLimitedTests(TestCase):
     def test_basic(self):
         def generator():
@@ -573,6 +880,136 @@ class TimeLimitedTests(TestCase):
             list(chunked.time_limited(-0.1, count()))
 
 
+class TimeLimitedClockTests(TestCase):
+    def test_check_every(self):
+        def generator():
+            yield 1
+            sleep(0.2)
+            yield from range(2, 10)
+
+        iterable = chunked.time_limited(0.1, generator(), check_every=3)
+        self.assertEqual(list(iterable), [1, 2, 3])
+        self.assertTrue(iterable.timed_out)
+
+    def test_invalid_check_every(self):
+        with self.assertRaises(ValueError):
+            chunked.time_limited(1, count(), check_every=0)
+
+    def test_slow_items_checked_every_time(self):
+        def generator():
+            for i in range(10):
+                sleep(0.03)
+                yield i
+
+        iterable = chunked.time_limited(0.1, generator())
+        actual = list(iterable)
+        self.assertTrue(iterable.timed_out)
+        self.assertLess(len(actual), 5)
+
+    def test_fast_items_amortised(self):
+        calls = 0
+        real_monotonic = chunked.monotonic
+
+        def counting_monotonic():
+            nonlocal calls
+            calls += 1
+            return real_monotonic()
+
+        chunked.monotonic = counting_monotonic
+        try:
+            actual = list(chunked.time_limited(60, iter(range(100_000)), check_every='auto'))
+        finally:
+            chunked.monotonic = real_monotonic
+        self.assertEqual(actual, list(range(100_000)))
+        self.assertLess(calls, 1000)
+
+    def test_slowdown_checked_every_time_by_default(self):
+        def generator():
+            yield from range(20_000)
+            while True:
+                sleep(0.005)
+                yield None
+
+        start = monotonic()
+        iterable = chunked.time_limited(0.2, generator())
+        for item in iterable:
+            pass
+        self.assertTrue(iterable.timed_out)
+        self.assertLess(monotonic() - start, 0.5)
+
+
+class TimeLimitedPreemptiveTests(TestCase):
+    def test_blocked_producer(self):
+        def generator():
+            yield 1
+            yield 2
+            sleep(2)
+            yield 3
+
+        start = monotonic()
+        iterable = chunked.time_limited(0.1, generator(), preemptive=True)
+        self.assertEqual(list(iterable), [1, 2])
+        self.assertTrue(iterable.timed_out)
+        self.assertLess(monotonic() - start, 1)
+
+    def test_complete(self):
+        iterable = chunked.time_limited(2, range(10), preemptive=True, prefetch=3)
+        self.assertEqual(list(iterable), list(range(10)))
+        self.assertFalse(iterable.timed_out)
+        self.assertRaises(StopIteration, lambda: next(iterable))
+
+    def test_zero_limit(self):
+        iterable = chunked.time_limited(0, count(), preemptive=True)
+        self.assertEqual(list(iterable), [])
+        self.assertTrue(iterable.timed_out)
+
+    def test_close(self):
+        closed = Event()
+
+        def source():
+            try:
+                yield from count()
+            finally:
+                closed.set()
+
+        iterable = chunked.time_limited(60, source(), preemptive=True, prefetch=2)
+        self.assertEqual(chunked.take(iterable, 3), [0, 1, 2])
+        iterable.close()
+        self.assertTrue(closed.wait(1))
+        self.assertRaises(StopIteration, lambda: next(iterable))
+
+    def test_dropped(self):
+        closed = Event()
+
+        def source():
+            try:
+                yield from count()
+            finally:
+                closed.set()
+
+        iterable = chunked.time_limited(60, source(), preemptive=True, prefetch=2)
+        self.assertEqual(next(iterable), 0)
+        del iterable
+        self.assertTrue(closed.wait(1))
+
+    def test_lazy_start(self):
+        threads = len(threading.enumerate())
+        iterable = chunked.time_limited(60, count(), preemptive=True)
+        self.assertEqual(len(threading.enumerate()), threads)
+        iterable.close()
+        self.assertEqual(list(iterable), [])
+
+    def test_producer_exception(self):
+        def generator():
+            yield 1
+            raise KeyError('boom')
+
+        iterable = chunked.time_limited(2, generator(), preemptive=True)
+        self.assertEqual(next(iterable), 1)
+        self.assertRaises(KeyError, lambda: next(iterable))
+        self.assertRaises(StopIteration, lambda: next(iterable))
+
+
 class DifferenceTests(TestCase):
     def test_normal(self):
         iterable = [10, 20, 30, 40, 50]
@@ -606,6 +1043,177 @@ class DifferenceTests(TestCase):
         self.assertEqual(original, actual)
 
 
+class DifferenceStreamTests(TestCase):
+    def test_iterator(self):
+        self.assertEqual(list(chunked.difference(iter([10, 20, 30]))), [10, 10, 10])
+        self.assertEqual(list(chunked.difference(iter([10, 20, 30]), initial=10)), [10, 10])
+        self.assertEqual(list(chunked.difference(iter([]))), [])
+
+    def test_lazy(self):
+        it = chunked.difference(count())
+        self.assertEqual(chunked.take(it, 3), [0, 1, 1])
+
+    def test_sequence_types(self):
+        for iterable in ([1, 4, 9], (1, 4, 9), range(1, 10, 3), b'\x01\x04\x09'):
+            with self.subTest(iterable=iterable):
+                expected = list(chunked.difference(iter(iterable)))
+                self.assertEqual(list(chunked.difference(iterable)), expected)
+
+
+class DifferenceChunksTests(TestCase):
+    def test_lists(self):
+        actual = list(chunked.difference_chunks([[1, 3], [], [6, 10], [15]]))
+        self.assertEqual(actual, [[1, 2], [], [3, 4], [5]])
+
+    def test_matches_difference(self):
+        data = [x * x for x in range(50)]
+        chunks = [array('q', chunk) for chunk in chunked.chunked(data, 7)]
+        actual = list(chain.from_iterable(chunked.difference_chunks(chunks)))
+        self.assertEqual(actual, list(chunked.difference(data)))
+
+    def test_array_type(self):
+        chunks = list(chunked.difference_chunks([array('d', [1.5, 2.5]), array('d', [4.0])]))
+        self.assertEqual(chunks, [array('d', [1.5, 1.0]), array('d', [1.5])])
+
+    def test_array_widened(self):
+        chunks = list(chunked.difference_chunks([array('B', [5, 3]), array('B', [250])]))
+        self.assertEqual(chunks, [array('q', [5, -2]), array('B', [247])])
+        chunks = list(chunked.difference_chunks([array('i', [1, 2]), array('i', [8])], truediv))
+        self.assertEqual(chunks, [array('d', [1.0, 2.0]), array('d', [4.0])])
+        chunks = list(chunked.accumulate_chunks([array('B', [200, 100])]))
+        self.assertEqual(chunks, [array('q', [200, 300])])
+        chunks = list(chunked.difference_chunks([array('q', [1, 2])], lambda a, b: str(a)))
+        self.assertEqual(chunks, [[1, '2']])
+
+    def test_custom_func(self):
+        actual = list(chunked.difference_chunks([[10, 20], [30]], add))
+        self.assertEqual(actual, [[10, 30], [50]])
+
+    def test_roundtrip(self):
+        chunks = [array('q', range(i, i + 5)) for i in range(0, 50, 5)]
+        self.assertEqual(list(chunked.difference_chunks(chunked.accumulate_chunks(chunks))), chunks)
+
+    def test_roundtrip_initial(self):
+        chunks = [array('q', [1, 2, 3]), array('q'), array('q', [4, 5])]
+        accumulated = list(chunked.accumulate_chunks(chunks, initial=100))
+        self.assertEqual(accumulated, [array('q', [100, 101, 103, 106]), array('q'), array('q', [110, 115])])
+        self.assertEqual(list(chunked.difference_chunks(accumulated, initial=100)), chunks)
+
+    def test_accumulate_matches_itertools(self):
+        data = list(range(1, 30))
+        actual = list(chain.from_iterable(chunked.accumulate_chunks(chunked.chunked(data, 4))))
+        self.assertEqual(actual, list(accumulate(data)))
+
+    @skipIf(np is None, 'numpy is not installed')
+    def test_ndarray(self):
+        data = np.arange(20) ** 2
+        chunks = np.array_split(data, 3)
+        diffs = list(chunked.difference_chunks(chunks))
+        self.assertEqual(np.concatenate(diffs).tolist(), chunked.difference(data).tolist())
+        restored = list(chunked.accumulate_chunks(diffs))
+        self.assertEqual(np.concatenate(restored).tolist(), data.tolist())
+
+    @skipIf(np is None, 'numpy is not installed')
+    def test_ndarray_initial(self):
+        chunks = [np.arange(3), np.arange(3, 5)]
+        accumulated = list(chunked.accumulate_chunks(chunks, initial=100))
+        self.assertEqual([c.tolist() for c in accumulated], [[100, 100, 101, 103], [106, 110]])
+        actual = list(chunked.difference_chunks(accumulated, initial=100))
+        self.assertEqual([c.tolist() for c in actual], [[0, 1, 2], [3, 4]])
+
+
+class WindowedTests(TestCase):
+    def test_basic(self):
+        self.assertEqual(list(chunked.windowed([1, 2, 3, 4, 5], 3)), [(1, 2, 3), (2, 3, 4), (3, 4, 5)])
+        self.assertEqual(list(chunked.windowed([1, 2, 3, 4, 5], 3, step=2)), [(1, 2, 3), (3, 4, 5)])
+
+    def test_fillvalue(self):
+        self.assertEqual(list(chunked.windowed([1, 2], 3, fillvalue='!')), [(1, 2, '!')])
+        self.assertEqual(list(chunked.windowed(range(6), 3, step=2)), [(0, 1, 2), (2, 3, 4), (4, 5, None)])
+        self.assertEqual(list(chunked.windowed(range(6), 2, step=4)), [(0, 1), (4, 5)])
+        self.assertEqual(list(chunked.windowed(range(7), 2, step=4)), [(0, 1), (4, 5)])
+
+    def test_edges(self):
+        self.assertEqual(list(chunked.windowed([], 3)), [])
+        self.assertEqual(list(chunked.windowed([1, 2], 0)), [()])
+        self.assertEqual(chunked.take(chunked.windowed(count(), 2), 2), [(0, 1), (1, 2)])
+        self.assertRaises(ValueError, lambda: chunked.windowed([], -1))
+        self.assertRaises(ValueError, lambda: chunked.windowed([], 2, step=0))
+
+
+class RollingTests(TestCase):
+    data = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5, 8, 9, 7, 9]
+
+    def naive(self, func, n):
+        return [func(window) for window in chunked.windowed(self.data, n)][:len(self.data) - n + 1]
+
+    def test_matches_naive(self):
+        for n in (1, 2, 4, 15):
+            with self.subTest(n=n):
+                self.assertEqual(list(chunked.rolling_sum(self.data, n)), self.naive(sum, n))
+                self.assertEqual(list(chunked.rolling_mean(self.data, n)), self.naive(lambda w: sum(w) / n, n))
+                self.assertEqual(list(chunked.rolling_min(self.data, n)), self.naive(min, n))
+                self.assertEqual(list(chunked.rolling_max(self.data, n)), self.naive(max, n))
+
+    def test_short_and_lazy(self):
+        self.assertEqual(list(chunked.rolling_sum([1, 2], 3)), [])
+        self.assertEqual(list(chunked.rolling_max([], 3)), [])
+        self.assertEqual(chunked.take(chunked.rolling_min(count(), 3), 3), [0, 1, 2])
+
+    def test_float_drift(self):
+        data = [0.1, 1e9, -1e9, 0.2] * 1000
+        actual = list(chunked.rolling_sum(data, 4))
+        self.assertAlmostEqual(actual[-1], 0.3, places=6)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, lambda: chunked.rolling_sum([], 0))
+        self.assertRaises(TypeError, lambda: chunked.rolling_min([], 1.5))
+        self.assertRaises(ValueError, lambda: chunked.rolling_chunks([], 2, 'median'))
+
+    def test_chunks(self):
+        chunks = [array('q', self.data[:4]), array('q'), array('q', self.data[4:5]), array('q', self.data[5:])]
+        for aggregate in ('sum', 'mean', 'min', 'max'):
+            with self.subTest(aggregate=aggregate):
+                actual = list(chunked.rolling_chunks(chunks, 3, aggregate))
+                self.assertEqual([len(c) for c in actual], [2, 0, 1, 10])
+                expected = list(getattr(chunked, f'rolling_{aggregate}')(self.data, 3))
+                self.assertEqual(list(chain.from_iterable(actual)), expected)
+        self.assertEqual(next(chunked.rolling_chunks([array('i', [1, 2])], 2, 'mean')), array('d', [1.5]))
+        self.assertEqual(list(chunked.rolling_chunks([[1, 2, 3], [4, 5]], 2)), [[3, 5], [7, 9]])
+        self.assertEqual(list(chunked.rolling_chunks([[1], [2], [3], [4]], 3)), [[], [], [6], [9]])
+
+    @skipIf(np is None, 'numpy is not installed')
+    def test_ndarray(self):
+        data = np.array(self.data * 40)
+        for aggregate in ('sum', 'mean', 'min', 'max'):
+            for n in (1, 7, 600, 601):
+                with self.subTest(aggregate=aggregate, n=n):
+                    function = getattr(chunked, f'rolling_{aggregate}')
+                    actual = function(data, n)
+                    self.assertIsInstance(actual, np.ndarray)
+                    np.testing.assert_allclose(actual, list(function(data.tolist(), n)))
+
+    @skipIf(np is None, 'numpy is not installed')
+    def test_ndarray_float32(self):
+        data = (1e4 + np.random.default_rng(0).random(200_000)).astype(np.float32)
+        expected = list(chunked.rolling_mean(data.tolist(), 10))
+        np.testing.assert_allclose(chunked.rolling_mean(data, 10), expected, rtol=0, atol=1e-6)
+        chunks = np.array_split(data, 7)
+        actual = np.concatenate(list(chunked.rolling_chunks(chunks, 10, 'mean')))
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-6)
+
+    @skipIf(np is None, 'numpy is not installed')
+    def test_ndarray_blocks(self):
+        data = np.random.default_rng(0).random(3 * chunked._ROLLING_BLOCK + 5)
+        for aggregate in ('sum', 'min'):
+            with self.subTest(aggregate=aggregate):
+                function = getattr(chunked, f'rolling_{aggregate}')
+                np.testing.assert_allclose(function(data, 100), list(function(data.tolist(), 100)))
+        chunks = np.array_split(data[:1000], 7)
+        actual = np.concatenate(list(chunked.rolling_chunks(chunks, 200, 'max')))
+        np.testing.assert_array_equal(actual, chunked.rolling_max(data[:1000], 200))
+
+
 class ValuChaintest(TestCase):
     def test_empty(self):
         actual = list(chunked.value_chain())
@@ -641,6 +1249,33 @@ class ValuChaintest(TestCase):
         self.assertEqual(actual, expected)
 
 
+class CollapseTests(TestCase):
+    def test_collapse(self):
+        iterable = [1, [2, (3, [4, iter([5])])], 'ab', b'cd', {'k': [6]}, [], 7.5]
+        self.assertEqual(list(chunked.collapse(iterable)), [1, 2, 3, 4, 5, 'ab', b'cd', 'k', 7.5])
+
+    def test_scalars(self):
+        self.assertEqual(list(chunked.collapse('abc')), ['abc'])
+        self.assertEqual(list(chunked.collapse(5)), [5])
+        self.assertEqual(list(chunked.collapse([[[]], ()])), [])
+
+    def test_base_type(self):
+        iterable = [1, (2, 3), [(4, [5])]]
+        self.assertEqual(list(chunked.collapse(iterable, base_type=tuple)), [1, (2, 3), (4, [5])])
+
+    def test_levels(self):
+        iterable = [1, [2, [3, [4]]], (5, 6)]
+        self.assertEqual(list(chunked.collapse(iterable, levels=0)), iterable)
+        self.assertEqual(list(chunked.collapse(iterable, levels=1)), [1, 2, [3, [4]], 5, 6])
+        self.assertEqual(list(chunked.collapse(iterable, levels=2)), [1, 2, 3, [4], 5, 6])
+
+    def test_deep(self):
+        iterable = []
+        for i in range(10 * sys.getrecursionlimit()):
+            iterable = [iterable, i]
+        self.assertEqual(sum(1 for _ in chunked.collapse(iterable)), 10 * sys.getrecursionlimit())
+
+
 class SequenceViewTests(TestCase):
     def test_init(self):
         view = chunked.SequenceView((1, 2, 3))
@@ -673,3 +1308,784 @@ class SequenceViewTests(TestCase):
         self.assertEqual(list(reversed(view)), list(reversed(seq)))
         self.assertEqual(seq.count('f'), 2)
 
+
+@skipIf(np is None, 'numpy is not installed')
+class NumpyBackendTests(TestCase):
+    def assertSameChunks(self, actual, expected):
+        self.assertEqual([chunk.tolist() for chunk in actual], expected)
+
+    def test_chunked(self):
+        arr = np.arange(8)
+        for n in (1, 3, 4, 8, 10, None):
+            with self.subTest(n=n):
+                self.assertSameChunks(chunked.chunked(arr, n), list(chunked.chunked(range(8), n)))
+
+    def test_chunked_views(self):
+        arr = np.arange(6)
+        chunks = list(chunked.chunked(arr, 4))
+        self.assertTrue(all(np.shares_memory(chunk, arr) for chunk in chunks))
+
+    def test_chunked_strict(self):
+        self.assertSameChunks(chunked.chunked(np.arange(6), 3, strict=True), [[0, 1, 2], [3, 4, 5]])
+        with self.assertRaisesRegex(ValueError, 'iterator is not divisible by n'):
+            list(chunked.chunked(np.arange(5), 3, strict=True))
+
+    def test_numpy_imported_after_chunked(self):
+        code = (
+            'import sys, chunked; '
+            "heavy = {'numpy', 'concurrent.futures', 'multiprocessing.shared_memory', 'pickle', 'tempfile'}; "
+            'assert not heavy & set(sys.modules), heavy & set(sys.modules); '
+            'print(list(chunked.chunked([1, 2, 3], 2))); '
+            'import numpy; '
+            'print([type(c).__name__ for c in chunked.chunked(numpy.arange(4), 2)])'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True, cwd=os.path.dirname(__file__)
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split('\n')[:2], ['[[1, 2], [3]]', "['ndarray', 'ndarray']"])
+
+    def test_chunked_2d(self):
+        arr = np.arange(10).reshape(5, 2)
+        self.assertSameChunks(chunked.chunked(arr, 2), [[[0, 1], [2, 3]], [[4, 5], [6, 7]], [[8, 9]]])
+
+    def test_split_into(self):
+        arr = np.arange(1, 10)
+        for sizes in ([2, 3, 4], [2, 3, 2], [2, 3, 4, 5], [2, 3, None], [3, True, 2, False], []):
+            with self.subTest(sizes=sizes):
+                expected = list(chunked.split_into(arr.tolist(), sizes))
+                self.assertSameChunks(chunked.split_into(arr, sizes), expected)
+
+    def test_split_into_invalid(self):
+        with self.assertRaises(ValueError):
+            list(chunked.split_into(np.arange(9), [1, [], 3]))
+
+    def test_split_into_sizes_integrity(self):
+        sizes = (i for i in [1, 2, None, 3, 4])
+        self.assertSameChunks(chunked.split_into(np.arange(1, 10), sizes), [[1], [2, 3], [4, 5, 6, 7, 8, 9]])
+        self.assertEqual(list(sizes), [3, 4])
+
+    def test_difference(self):
+        arr = np.array([10, 20, 30, 40, 50])
+        self.assertEqual(chunked.difference(arr).tolist(), [10, 10, 10, 10, 10])
+        self.assertEqual(chunked.difference(arr, add).tolist(), [10, 30, 50, 70, 90])
+        self.assertEqual(chunked.difference(arr, np.maximum).tolist(), [10, 20, 30, 40, 50])
+        self.assertEqual(chunked.difference(np.array([], dtype=int)).tolist(), [])
+
+    def test_difference_initial(self):
+        original = np.arange(100)
+        accumulated = np.cumsum(np.concatenate(([100], original)))
+        self.assertEqual(chunked.difference(accumulated, initial=100).tolist(), original.tolist())
+
+    def test_difference_custom_func(self):
+        arr = np.array([1, 4, 9])
+        actual = list(chunked.difference(arr, lambda x, y: int(x) * 10 + int(y)))
+        self.assertEqual(actual, [1, 41, 94])
+
+
+class SequenceViewSliceTests(TestCase):
+    def test_slice_is_view(self):
+        seq = list(range(10))
+        window = chunked.SequenceView(seq)[2:8]
+        self.assertIsInstance(window, chunked.SequenceView)
+        self.assertEqual(list(window), [2, 3, 4, 5, 6, 7])
+        seq[3] = 'x'
+        self.assertEqual(window[1], 'x')
+
+    def test_composed_slices(self):
+        seq = list(range(20))
+        view = chunked.SequenceView(seq)
+        for first, second in [
+            (slice(2, 18), slice(None, None, 3)),
+            (slice(None, None, -1), slice(1, 5)),
+            (slice(15, 2, -2), slice(-3, None)),
+            (slice(5, 5), slice(None)),
+            (slice(-100, 100), slice(3, -3, 4)),
+        ]:
+            with self.subTest(first=first, second=second):
+                window = view[first][second]
+                expected = seq[first][second]
+                self.assertEqual(list(window), expected)
+                self.assertEqual(len(window), len(expected))
+                self.assertEqual(list(reversed(window)), expected[::-1])
+                self.assertEqual([window[i] for i in range(-len(expected), len(expected))], expected * 2)
+
+    def test_index_count(self):
+        seq = ['a', 'b', 'c', 'b', 'a', 'b']
+        view = chunked.SequenceView(seq)
+        window = view[1:]
+        self.assertEqual(window.index('b'), 0)
+        self.assertEqual(window.index('b', 1), 2)
+        self.assertEqual(window.index('a', -3, -1), 3)
+        self.assertRaises(ValueError, lambda: window.index('a', 0, 3))
+        self.assertEqual(window.count('b'), 3)
+        self.assertEqual(view[::2].count('b'), 0)
+        self.assertEqual(view.index('c'), 2)
+
+    def test_repr(self):
+        view = chunked.SequenceView([1, 2, 3])
+        self.assertEqual(repr(view[1:]), 'SequenceView([1, 2, 3])[1:3:1]')
+        self.assertEqual(repr(view[::-1]), 'SequenceView([1, 2, 3])[2::-1]')
+
+    def test_is_sequence(self):
+        view = chunked.SequenceView('abcdef')
+        self.assertEqual(chunked.last(view[:3]), 'c')
+        chunks = list(chunked.chunked(view[1:], 2, zero_copy=True))
+        self.assertTrue(all(isinstance(chunk, chunked.SequenceView) for chunk in chunks))
+        self.assertEqual([list(chunk) for chunk in chunks], [['b', 'c'], ['d', 'e'], ['f']])
+
+
+class ReversedLinesTests(TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'data.log')
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def test_matches_readlines(self):
+        for data in [
+            b'', b'\n', b'\n\n', b'a', b'a\n', b'a\nbb\n\nccc',
+            b''.join(b'line %d\n' % i for i in range(500)),
+            b'x' * 1000 + b'\n' + b'y' * 10,
+        ]:
+            self.write(data)
+            for block_size in (1, 2, 3, 64, 1 << 16):
+                with self.subTest(data=data[:20], block_size=block_size):
+                    with open(self.path, 'rb') as f:
+                        expected = f.readlines()[::-1]
+                        f.seek(0)
+                        self.assertEqual(list(chunked.reversed_lines(f, block_size)), expected)
+
+    def test_text(self):
+        self.write('première\r\ndeuxième\r\nfin'.encode('utf-8'))
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(list(chunked.reversed_lines(f, 4)), ['fin', 'deuxième\n', 'première\n'])
+            self.assertEqual(f.read(), '')
+
+    def test_text_newline_modes(self):
+        for data in [b'a\r\nb\r\nc\r\n', b'a\rb\r\nc\n\nd', b'a\nb\r', b'a\n\r\nb\n']:
+            self.write(data)
+            for newline in (None, '', '\n'):
+                with self.subTest(data=data, newline=newline):
+                    with open(self.path, newline=newline) as f:
+                        expected = f.readlines()
+                        f.seek(0)
+                        self.assertEqual(list(chunked.reversed_lines(f, 2)), expected[::-1])
+                        f.seek(0)
+                        self.assertEqual(chunked.last(f), expected[-1])
+
+    def test_long_line(self):
+        self.write(b'a\n' + b'x' * 100_000 + b'\n')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(list(chunked.reversed_lines(f, 7)), [b'x' * 100_000 + b'\n', b'a\n'])
+
+    def test_from_current_position(self):
+        self.write(b'a\nb\nc\n')
+        with open(self.path, 'rb') as f:
+            f.readline()
+            self.assertEqual(list(chunked.always_reversible(f)), [b'c\n', b'b\n'])
+            self.assertEqual(f.read(), b'')
+
+    def test_last(self):
+        self.write(b''.join(b'%d\n' % i for i in range(10000)))
+        with open(self.path, 'rb') as f:
+            self.assertEqual(chunked.last(f), b'9999\n')
+            self.assertEqual(f.read(), b'')
+        with open(self.path) as f:
+            self.assertEqual(chunked.last(f), '9999\n')
+        self.write(b'')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(chunked.last(f, None), None)
+            self.assertRaises(ValueError, lambda: chunked.last(f))
+
+    def test_mmap(self):
+        self.write(b'a\nbb\nccc')
+        with open(self.path, 'rb') as f, mmap(f.fileno(), 0, access=ACCESS_READ) as mm:
+            self.assertEqual(list(chunked.reversed_lines(mm, 2)), [b'ccc', b'bb\n', b'a\n'])
+            self.assertEqual(chunked.last(mm), b'c')
+
+    def test_unsupported(self):
+        self.assertRaises(TypeError, lambda: chunked.reversed_lines(iter([b'a\n'])))
+        with open(self.path, 'w', encoding='utf-16') as f:
+            f.write('a\nb\n')
+        with open(self.path, encoding='utf-16') as f:
+            self.assertEqual(list(chunked.always_reversible(f)), ['b\n', 'a\n'])
+        self.assertEqual(list(chunked.always_reversible(StringIO('a\nb\n'))), ['b\n', 'a\n'])
+
+
+class LineIndexTests(TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'data.log')
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(chunked.LineIndex._cache.clear)
+
+    def write(self, data, mode='wb'):
+        with open(self.path, mode) as f:
+            f.write(data)
+
+    def test_offsets(self):
+        for data, offsets in [
+            (b'', []), (b'a', [0]), (b'a\n', [0]), (b'\n\n', [0, 1]), (b'ab\ncd\ne', [0, 3, 6]),
+        ]:
+            with self.subTest(data=data):
+                self.write(data)
+                index = chunked.LineIndex.open(self.path, save=False)
+                self.assertEqual([index.offset(i) for i in range(len(index))], offsets)
+
+    def test_small_blocks(self):
+        data = b''.join(b'%d\n' % i for i in range(1000))
+        self.write(data)
+        index = chunked.LineIndex(self.path)
+        index.update(block_size=7)
+        with open(self.path, 'rb') as f:
+            expected = [f.tell() for _ in iter(f.readline, b'')][:-1]
+        self.assertEqual([0] + expected, [index.offset(i) for i in range(len(index))])
+
+    def test_sidecar_roundtrip(self):
+        self.write(b'a\nbb\nccc\n')
+        chunked.LineIndex.open(self.path)
+        self.assertTrue(os.path.exists(self.path + chunked.LineIndex.SUFFIX))
+        loaded = chunked.LineIndex.load(self.path)
+        self.assertEqual(len(loaded), 3)
+        self.assertEqual(loaded.offset(-1), 5)
+        self.assertFalse(loaded.update())
+
+    def test_incremental_update(self):
+        self.write(b'a\nbb')
+        chunked.LineIndex.open(self.path)
+        self.write(b'b\nccc\n', 'ab')
+        index = chunked.LineIndex.load(self.path)
+        self.assertTrue(index.update())
+        self.assertEqual([index.offset(i) for i in range(len(index))], [0, 2, 6])
+        self.write(b'x\n')
+        index.update()
+        self.assertEqual(len(index), 1)
+
+    def test_invalid_sidecar(self):
+        self.write(b'a\n')
+        with open(self.path + chunked.LineIndex.SUFFIX, 'wb') as f:
+            f.write(b'garbage')
+        self.assertIsNone(chunked.LineIndex.load(self.path))
+
+    def test_nth_or_last(self):
+        self.write(b''.join(b'%d\n' % i for i in range(1000)))
+        chunked.LineIndex.open(self.path)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(chunked.nth_or_last(f, 500), b'500\n')
+            self.assertEqual(f.readline(), b'501\n')
+            self.assertEqual(chunked.nth_or_last(f, 10), b'512\n')
+            self.assertEqual(chunked.nth_or_last(f, 10 ** 6), b'999\n')
+            self.assertEqual(chunked.nth_or_last(f, 1, 'empty'), 'empty')
+        with open(self.path) as f:
+            self.assertEqual(chunked.nth_or_last(f, 7), '7\n')
+
+    def test_file_grows(self):
+        self.write(b'a\n')
+        chunked.LineIndex.open(self.path)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(chunked.last(f), b'a\n')
+        self.write(b'b\nc', 'ab')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(chunked.nth_or_last(f, 2), b'c')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(chunked.last(f), b'c')
+        self.assertEqual(len(chunked.LineIndex.load(self.path)), 3)
+
+    def test_split_into(self):
+        self.write(b''.join(b'%d\n' % i for i in range(1, 10)))
+        chunked.LineIndex.open(self.path)
+        for sizes in ([2, 3, 4], [2, 3, 2], [2, 3, 4, 5], [2, 3, None], [3, True, 2, False], [2, 4, None, 2], []):
+            with self.subTest(sizes=sizes):
+                with open(self.path, 'rb') as f:
+                    expected = list(chunked._split_into(f, sizes))
+                with open(self.path, 'rb') as f:
+                    self.assertEqual(list(chunked.split_into(f, sizes)), expected)
+
+    def test_rewritten_same_size(self):
+        self.write(b''.join(b'LINE%d\n' % i for i in range(1, 13)))
+        chunked.LineIndex.open(self.path)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(chunked.nth_or_last(f, 3), b'LINE4\n')
+        self.write(b' '.join(b'LINE%d' % i for i in range(1, 12)) + b'\nLINE12\n')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(chunked.nth_or_last(f, 3), b'LINE12\n')
+
+    def test_rotated_and_grown(self):
+        self.write(b'a\nb\n')
+        chunked.LineIndex.open(self.path)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(chunked.last(f), b'b\n')
+        os.replace(self.path, self.path + '.1')
+        self.write(b'new first line\nsecond\n')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(chunked.nth_or_last(f, 1), b'second\n')
+        self.assertEqual(len(chunked.LineIndex.load(self.path)), 2)
+
+    @skipIf(os.name != 'posix' or os.geteuid() == 0, 'needs a directory that is really read-only')
+    def test_read_only_directory(self):
+        self.write(b'a\n')
+        chunked.LineIndex.open(self.path)
+        self.write(b'b\n', 'ab')
+        os.chmod(self.tmp.name, 0o555)
+        self.addCleanup(os.chmod, self.tmp.name, 0o755)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(chunked.last(f), b'b\n')
+
+    def test_save_failure_ignored(self):
+        self.write(b'a\n')
+        chunked.LineIndex.open(self.path)
+        self.write(b'b\n', 'ab')
+        real_replace = chunked.os.replace
+
+        def failing_replace(src, dst):
+            os.remove(src)
+            raise PermissionError(dst)
+
+        chunked.os.replace = failing_replace
+        try:
+            with open(self.path, 'rb') as f:
+                self.assertEqual(chunked.last(f), b'b\n')
+        finally:
+            chunked.os.replace = real_replace
+
+    def test_no_sidecar(self):
+        self.write(b'a\nb\n')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(chunked.nth_or_last(f, 1), b'b\n')
+        self.assertFalse(os.path.exists(self.path + chunked.LineIndex.SUFFIX))
+
+
+class SeekableTests(TestCase):
+    def test_seek(self):
+        it = chunked.seekable(x for x in range(10))
+        self.assertEqual(chunked.take(it, 3), [0, 1, 2])
+        it.seek(1)
+        self.assertEqual(it.tell(), 1)
+        self.assertEqual(chunked.take(it, 3), [1, 2, 3])
+        it.seek(7)
+        self.assertEqual(list(it), [7, 8, 9])
+        it.seek(20)
+        self.assertEqual(list(it), [])
+        it.relative_seek(-2)
+        self.assertEqual(list(it), [8, 9])
+        it.relative_seek(-100)
+        self.assertEqual(next(it), 0)
+        self.assertRaises(ValueError, lambda: it.seek(-1))
+
+    def test_peek(self):
+        it = chunked.seekable(iter([1, 2]))
+        self.assertEqual(it.peek(), 1)
+        self.assertEqual(list(it), [1, 2])
+        self.assertEqual(it.peek('done'), 'done')
+        self.assertRaises(StopIteration, it.peek)
+
+    def test_maxlen(self):
+        it = chunked.seekable(iter(range(10)), maxlen=3)
+        self.assertEqual(chunked.take(it, 6), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(len(it._cache), 3)
+        it.seek(3)
+        self.assertEqual(next(it), 3)
+        self.assertRaises(ValueError, lambda: it.seek(2))
+        self.assertRaises(ValueError, lambda: chunked.seekable([], maxlen=0))
+
+    def test_spill(self):
+        it = chunked.seekable(({'n': x} for x in range(100)), maxlen=5, spill=True)
+        self.assertEqual(len(list(it)), 100)
+        self.assertEqual(len(it._cache), 5)
+        it.seek(10)
+        self.assertEqual(chunked.take(it, 2), [{'n': 10}, {'n': 11}])
+        it.seek(0)
+        self.assertEqual([item['n'] for item in it], list(range(100)))
+
+    def test_first_one_only_do_not_consume(self):
+        it = chunked.seekable(iter(['a']))
+        self.assertEqual(chunked.first(it), 'a')
+        self.assertEqual(chunked.one(it), 'a')
+        self.assertEqual(chunked.only(it), 'a')
+        self.assertEqual(list(it), ['a'])
+        self.assertEqual(chunked.first(it, 'empty'), 'empty')
+
+        it = chunked.seekable(count())
+        self.assertRaises(ValueError, lambda: chunked.one(it))
+        self.assertRaises(ValueError, lambda: chunked.only(it))
+        self.assertEqual(it.tell(), 0)
+        self.assertEqual(len(it._cache), 2)
+
+    def test_first_empty(self):
+        try:
+            chunked.first(chunked.seekable([]))
+        except ValueError:
+            self.assertIn('StopIteration', traceback.format_exc())
+        else:
+            self.fail()
+
+    def test_strictly_n(self):
+        it = chunked.seekable(iter('ABCD'))
+        next(it)
+        self.assertEqual(list(chunked.strictly_n(it, 3)), ['B', 'C', 'D'])
+        self.assertEqual(it.tell(), 1)
+        with self.assertRaises(ValueError):
+            list(chunked.strictly_n(it, 2))
+        self.assertEqual(list(it), ['B', 'C', 'D'])
+
+    def test_rewind_limited_by_maxlen(self):
+        it = chunked.seekable(iter(range(10)), maxlen=2)
+        self.assertEqual(list(chunked.strictly_n(it, 10)), list(range(10)))
+        self.assertEqual(it.tell(), 10)
+
+
+class LazySubIteratorTests(TestCase):
+    def test_ichunked(self):
+        for n in (1, 3, 7, 10, None):
+            with self.subTest(n=n):
+                actual = [list(chunk) for chunk in chunked.ichunked(range(7), n)]
+                self.assertEqual(actual, list(chunked.chunked(range(7), n)))
+        self.assertRaises(ValueError, lambda: chunked.ichunked([], 0))
+
+    def test_ichunked_lazy(self):
+        pulled = []
+
+        def source():
+            for i in range(10):
+                pulled.append(i)
+                yield i
+
+        chunks = chunked.ichunked(source(), 4)
+        chunk = next(chunks)
+        self.assertEqual(next(chunk), 0)
+        self.assertEqual(pulled, [0])
+        self.assertEqual(next(chunk), 1)
+        self.assertEqual(pulled, [0, 1])
+
+    def test_ichunked_skip_ahead(self):
+        chunks = chunked.ichunked(range(10), 4)
+        first_chunk, second_chunk = next(chunks), next(chunks)
+        third_chunk = next(chunks)
+        self.assertEqual(list(third_chunk), [8, 9])
+        self.assertEqual(list(first_chunk), [0, 1, 2, 3])
+        self.assertEqual(list(second_chunk), [4, 5, 6, 7])
+        self.assertEqual(list(chunks), [])
+
+    def test_ichunked_infinite(self):
+        chunks = chunked.ichunked(count(), 10 ** 9)
+        self.assertEqual(chunked.take(next(chunks), 3), [0, 1, 2])
+
+    def test_isplit_into(self):
+        iterable = [1, 2, 3, 4, 5, 6, 7, 8, 9]
+        for sizes in ([2, 3, 4], [2, 3, 2], [2, 3, 4, 5], [2, 3, None], [2, 3, None, 4], [3, True, 2, False], []):
+            with self.subTest(sizes=sizes):
+                actual = [list(group) for group in chunked.isplit_into(iterable, sizes)]
+                self.assertEqual(actual, list(chunked.split_into(iterable, sizes)))
+
+    def test_isplit_into_skip_ahead(self):
+        groups = list(chunked.isplit_into(iter(range(10)), [3, 3, None]))
+        self.assertEqual([list(group) for group in groups], [[0, 1, 2], [3, 4, 5], [6, 7, 8, 9]])
+
+    def test_isplit_after(self):
+        for args in [
+            ('xooxoo', lambda c: c == 'x'),
+            ('ooxoox', lambda c: c == 'x'),
+            ('ooo', lambda c: c == 'x'),
+            ('', lambda c: c == 'x'),
+            ('a,b,c,d', lambda c: c == ',', 0),
+            ('a,b,c,d', lambda c: c == ',', 1),
+            ('a,b,c,d', lambda c: c == ',', 2),
+            ('a,b,c,d', lambda c: c == ',', 10),
+            ('a,b,c,d', lambda c: c != ',', 2),
+            ('ab,', lambda c: c == ',', 1),
+        ]:
+            with self.subTest(args=args):
+                lazy = [list(group) for group in chunked.isplit_after(*args)]
+                eager = list(chunked.split_after(*args))
+                self.assertEqual(lazy, eager)
+                skipped = list(chunked.isplit_after(*args))
+                self.assertEqual([list(group) for group in skipped], eager)
+
+
+class SpillBufferTests(TestCase):
+    def test_fifo(self):
+        buffer = chunked.SpillBuffer(budget=4)
+        expected = deque()
+        for i in range(50):
+            buffer.append(i)
+            expected.append(i)
+            if i % 3 == 0:
+                self.assertEqual(buffer.popleft(), expected.popleft())
+            self.assertEqual(len(buffer), len(expected))
+            self.assertLessEqual(len(buffer) - buffer.spilled, 4)
+        self.assertGreater(buffer.spilled, 0)
+        self.assertEqual([buffer.popleft() for _ in range(len(buffer))], list(expected))
+        self.assertEqual(buffer.spilled, 0)
+        self.assertRaises(IndexError, buffer.popleft)
+        buffer.close()
+
+    def test_out_of_band_buffers(self):
+        buffer = chunked.SpillBuffer(budget=2)
+        items = [bytearray(b'x' * 1000), {'a': bytearray(b'yz')}, 3, bytearray(), 'end']
+        for item in items:
+            buffer.append(item)
+        self.assertEqual([buffer.popleft() for _ in items], items)
+
+    @skipIf(np is None, 'NumPy is not installed')
+    def test_ndarray(self):
+        buffer = chunked.SpillBuffer(budget=2)
+        arrays = [np.arange(i, i + 100, dtype=np.float32) for i in range(5)]
+        for arr in arrays:
+            buffer.append(arr)
+        for arr in arrays:
+            actual = buffer.popleft()
+            self.assertEqual(actual.dtype, arr.dtype)
+            self.assertTrue((actual == arr).all())
+
+    def test_invalid_budget(self):
+        self.assertRaises(ValueError, lambda: chunked.SpillBuffer(1))
+
+
+class SpillTeeTests(TestCase):
+    def test_out_of_step(self):
+        a, b, c = chunked.spill_tee(iter(range(100)), 3, budget=4)
+        self.assertEqual(list(a), list(range(100)))
+        self.assertEqual(chunked.take(b, 10), list(range(10)))
+        self.assertEqual(list(c), list(range(100)))
+        self.assertEqual(list(b), list(range(10, 100)))
+
+    def test_closed_consumer(self):
+        a, b = chunked.spill_tee(iter(range(10)), budget=2)
+        self.assertEqual(next(b), 0)
+        b.close()
+        self.assertEqual(list(a), list(range(10)))
+
+    def test_dropped_consumer(self):
+        refs = []
+
+        def source():
+            for i in range(1000):
+                item = {i}
+                refs.append(weakref.ref(item))
+                yield item
+
+        a, b = chunked.spill_tee(source(), budget=100)
+        del b
+        self.assertEqual(len(chunked.take(a, 500)), 500)
+        # Only the item the source is suspended on is still alive.
+        self.assertEqual([ref for ref in refs[:-1] if ref() is not None], [])
+
+    def test_n(self):
+        self.assertEqual(chunked.spill_tee(range(3), 0), ())
+        self.assertRaises(ValueError, lambda: chunked.spill_tee(range(3), -1))
+
+
+class MapChunksSharedTests(TestCase):
+    def test_array(self):
+        actual = chunked.map_chunks_shared(_double_chunk, array('d', range(10)), 3, max_workers=2)
+        self.assertEqual(actual, array('d', [2.0 * x for x in range(10)]))
+
+    def test_bytes(self):
+        self.assertEqual(chunked.map_chunks_shared(_upper_chunk, b'hello world', 4, max_workers=2), b'HELLO WORLD')
+        actual = chunked.map_chunks_shared(_upper_chunk, bytearray(b'abc'), 2, max_workers=1)
+        self.assertEqual(actual, bytearray(b'ABC'))
+        self.assertIsInstance(actual, bytearray)
+        self.assertEqual(chunked.map_chunks_shared(_upper_chunk, b'', 4), b'')
+
+    def test_out(self):
+        out = array('i', [0] * 5)
+        result = chunked.map_chunks_shared(_double_chunk, array('i', range(5)), 2, max_workers=2, out=out)
+        self.assertIs(result, out)
+        self.assertEqual(out, array('i', [0, 2, 4, 6, 8]))
+        with self.assertRaises(ValueError):
+            chunked.map_chunks_shared(_double_chunk, array('i', range(5)), 2, max_workers=1, out=array('i'))
+
+    @skipIf(np is None, 'NumPy is not installed')
+    def test_ndarray(self):
+        data = np.arange(20, dtype=np.int64)[::2]
+        actual = chunked.map_chunks_shared(np.square, data, 3, max_workers=2)
+        self.assertEqual(actual.dtype, data.dtype)
+        self.assertEqual(actual.tolist(), [x * x for x in data.tolist()])
+
+    @skipIf(np is None, 'NumPy is not installed')
+    def test_ndarray_wrong_length(self):
+        data = np.arange(10, dtype=np.int64)
+        for func in (_short_chunk, np.sum):
+            with self.subTest(func=func):
+                with self.assertRaisesRegex(ValueError, 'as many items'):
+                    chunked.map_chunks_shared(func, data, 3, max_workers=1)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            chunked.map_chunks_shared(_short_chunk, array('i', range(5)), 2, max_workers=1)
+        with self.assertRaises(TypeError):
+            chunked.map_chunks_shared(_double_chunk, [1, 2, 3], 2)
+        with self.assertRaises(ValueError):
+            chunked.map_chunks_shared(_double_chunk, b'abc', 0)
+
+
+class PrefetchTests(TestCase):
+    def test_items(self):
+        for depth, chunk_size in [(1, 1), (2, 3), (4, 64)]:
+            with self.subTest(depth=depth, chunk_size=chunk_size):
+                actual = chunked.prefetch(iter(range(100)), depth, chunk_size)
+                self.assertEqual(list(actual), list(range(100)))
+        self.assertEqual(list(chunked.prefetch([])), [])
+
+    def test_exception_after_preceding_items(self):
+        actual = []
+        with self.assertRaises(KeyError):
+            for item in chunked.prefetch(map(_fail_on_seven, range(10)), chunk_size=4):
+                actual.append(item)
+        self.assertEqual(actual, list(range(7)))
+
+    def test_early_stop(self):
+        closed = Event()
+
+        def source():
+            try:
+                yield from count()
+            finally:
+                closed.set()
+
+        iterable = chunked.prefetch(source(), depth=2, chunk_size=8)
+        self.assertEqual(chunked.take(iterable, 3), [0, 1, 2])
+        iterable.close()
+        self.assertTrue(closed.wait(1))
+
+    def test_base_exception(self):
+        def source():
+            yield 1
+            raise SystemExit(3)
+
+        results = []
+
+        def consume():
+            try:
+                results.extend(chunked.prefetch(source(), chunk_size=1))
+            except SystemExit as e:
+                results.append(e.code)
+
+        thread = Thread(target=consume, daemon=True)
+        thread.start()
+        thread.join(2)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(results, [1, 3])
+
+    def test_overlap(self):
+        def producer():
+            for i in range(5):
+                sleep(0.05)
+                yield i
+
+        start = monotonic()
+        for item in chunked.prefetch(producer(), depth=5, chunk_size=1):
+            sleep(0.05)
+        self.assertLess(monotonic() - start, 0.45)
+
+    def test_chunked_and_split_into(self):
+        self.assertEqual(list(chunked.chunked(iter(range(7)), 3, prefetch=2)), [[0, 1, 2], [3, 4, 5], [6]])
+        with self.assertRaisesRegex(ValueError, 'iterator is not divisible by n'):
+            list(chunked.chunked(iter(range(7)), 3, strict=True, prefetch=2))
+        actual = list(chunked.split_into(iter(range(7)), [1, 2, None], prefetch=1))
+        self.assertEqual(actual, [[0], [1, 2], [3, 4, 5, 6]])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, lambda: chunked.prefetch([], depth=0))
+        self.assertRaises(ValueError, lambda: chunked.prefetch([], chunk_size=0))
+        self.assertRaises(ValueError, lambda: chunked.chunked([], 2, prefetch=0))
+
+
+class RegistryTests(TestCase):
+    def test_register_custom_type(self):
+        class Column:
+            def __init__(self, values):
+                self.values = values
+
+            def __iter__(self):
+                raise AssertionError('should not iterate')
+
+        chunked.register(chunked.last, Column, lambda column, default=None: column.values[-1])
+
+        @chunked.register(chunked.first, Column)
+        def _first_column(column, default=None):
+            return column.values[0]
+
+        column = Column([1, 2, 3])
+        self.assertEqual(chunked.first(column), 1)
+        self.assertEqual(chunked.last(column), 3)
+        self.assertEqual(_first_column.__name__, '_first_column')
+
+    def test_register_subclass_wins(self):
+        class Tagged(list):
+            pass
+
+        chunked.register('one', Tagged, lambda iterable, too_short=None, too_long=None: 'tagged')
+        self.assertEqual(chunked.one(Tagged([1, 2])), 'tagged')
+        self.assertEqual(chunked.one([1]), 1)
+
+    def test_register_unknown(self):
+        self.assertRaises(ValueError, lambda: chunked.register(chunked.take, list, len))
+
+    def test_matches_generic(self):
+        for iterable in [range(7), list(range(7)), tuple(range(7)), 'abcdefg', b'abcdefg', array('i', range(7))]:
+            with self.subTest(iterable=iterable):
+                items = list(iterable)
+                self.assertEqual(chunked.first(iterable), items[0])
+                self.assertEqual(chunked.last(iterable), items[-1])
+                self.assertEqual(chunked.nth_or_last(iterable, 3), items[3])
+                self.assertEqual(chunked.nth_or_last(iterable, 30), items[-1])
+                self.assertEqual(list(chunked.chunked(iterable, 3)), list(chunked.chunked(iter(items), 3)))
+                self.assertEqual(
+                    list(chunked.split_into(iterable, [1, 2, None])),
+                    list(chunked.split_into(iter(items), [1, 2, None])),
+                )
+                self.assertEqual(list(chunked.strictly_n(iterable, 7)), items)
+                self.assertRaises(ValueError, lambda: chunked.one(iterable))
+                self.assertRaises(ValueError, lambda: chunked.only(iterable))
+
+    def test_chunked_returns_lists(self):
+        for iterable in [range(5), (1, 2, 3), 'abc', bytearray(b'abc')]:
+            with self.subTest(iterable=iterable):
+                self.assertTrue(all(type(chunk) is list for chunk in chunked.chunked(iterable, 2)))
+
+    def test_invalid_counts_keep_errors(self):
+        for iterable in ([1, 2, 3], 'abc', range(3), b'abc'):
+            with self.subTest(iterable=iterable):
+                for n in (-1, 1.5):
+                    with self.assertRaisesRegex(ValueError, 'islice'):
+                        list(chunked.chunked(iterable, n))
+                with self.assertRaisesRegex(ValueError, 'islice'):
+                    chunked.nth_or_last(iterable, 1.5)
+                with self.assertRaisesRegex(ValueError, 'islice'):
+                    list(chunked.split_into(iterable, [1, -1]))
+
+    def test_abc_registration(self):
+        class Column:
+            def __init__(self, values):
+                self.values = values
+
+            def __len__(self):
+                return len(self.values)
+
+            def __getitem__(self, index):
+                return self.values[index]
+
+            def __iter__(self):
+                raise AssertionError('should not iterate')
+
+        column = Column([1, 2, 3])
+        self.assertRaises(AssertionError, lambda: chunked.first(column))
+        Sequence.register(Column)
+        self.assertEqual(chunked.first(column), 1)
+        self.assertEqual(chunked.last(column), 3)
+
+    def test_sized_errors(self):
+        self.assertEqual(chunked.one(range(3, 4)), 3)
+        self.assertEqual(chunked.only(range(0), 'x'), 'x')
+        with self.assertRaisesRegex(ValueError, 'too few items in iterable'):
+            chunked.one(range(0))
+        with self.assertRaisesRegex(ValueError, 'Expected exactly on item'):
+            chunked.one([1, 2])
+        self.assertRaises(ValueError, lambda: list(chunked.strictly_n(range(3), 4)))
+        with self.assertRaisesRegex(ValueError, 'empty'):
+            chunked.first(range(0))
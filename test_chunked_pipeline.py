@@ -0,0 +1,114 @@
+from itertools import count
+from operator import add
+from unittest import TestCase
+
+import chunked
+from chunked_pipeline import Pipeline
+
+
+def _double(x):
+    return 2 * x
+
+
+def _is_odd(x):
+    return x % 2
+
+
+def _fail_on_seven(x):
+    if x == 7:
+        raise KeyError(x)
+    return x
+
+
+class PipelineTests(TestCase):
+    def test_matches_unfused_chain(self):
+        for batch_size in (1, 3, 256):
+            with self.subTest(batch_size=batch_size):
+                pipeline = (
+                    Pipeline(range(50), batch_size=batch_size)
+                    .map(_double).filter(lambda x: x % 3).map_if(lambda x: x > 20, str)
+                    .split_after(lambda x: x == '28').chunked(3)
+                )
+                expected = chunked.chunked(chunked.split_after(chunked.map_if(
+                    filter(lambda x: x % 3, map(_double, range(50))), lambda x: x > 20, str
+                ), lambda x: x == '28'), 3)
+                self.assertEqual(list(pipeline), list(expected))
+
+    def test_reusable(self):
+        base = Pipeline([1, 2, 3]).map(_double)
+        self.assertEqual(base.to_list(), [2, 4, 6])
+        self.assertEqual(base.map(str).to_list(), ['2', '4', '6'])
+        self.assertEqual(base.to_list(), [2, 4, 6])
+
+    def test_call_order(self):
+        calls = []
+
+        def record(tag):
+            def func(x):
+                calls.append((tag, x))
+                return x
+            return func
+
+        list(Pipeline(range(3), batch_size=2).map(record('a')).map(record('b')))
+        self.assertEqual(calls, [('a', 0), ('a', 1), ('b', 0), ('b', 1), ('a', 2), ('b', 2)])
+
+    def test_exception_after_preceding_items(self):
+        for pipeline in [
+            Pipeline(range(10), batch_size=4).map(_fail_on_seven),
+            Pipeline(range(10), batch_size=4).filter(lambda x: True).map(_fail_on_seven),
+            Pipeline(range(10), batch_size=4).map(_fail_on_seven).map(_double).map(_double),
+        ]:
+            actual = []
+            with self.assertRaises(KeyError):
+                for item in pipeline:
+                    actual.append(item)
+            self.assertEqual(len(actual), 7)
+
+    def test_earlier_exception_wins(self):
+        pipeline = Pipeline(range(10), batch_size=8).map(_fail_on_seven).map(lambda x: 1 // (x - 5))
+        actual = []
+        with self.assertRaises(ZeroDivisionError):
+            for item in pipeline:
+                actual.append(item)
+        self.assertEqual(len(actual), 5)
+
+    def test_fused_chunked(self):
+        pipeline = Pipeline(range(10)).map(_double).chunked(4)
+        self.assertEqual(list(pipeline), [[0, 2, 4, 6], [8, 10, 12, 14], [16, 18]])
+        with self.assertRaisesRegex(ValueError, 'iterator is not divisible by n'):
+            list(Pipeline(range(10)).map(_double).chunked(4, strict=True))
+        with self.assertRaises(ValueError):
+            Pipeline(range(10)).chunked(None, strict=True)
+
+    def test_other_stages(self):
+        self.assertEqual(Pipeline([10, 20, 30]).difference(add).to_list(), [10, 30, 50])
+        self.assertEqual(Pipeline(range(1, 10)).split_into([2, 3, None]).to_list(),
+                         [[1, 2], [3, 4, 5], [6, 7, 8, 9]])
+        with self.assertRaises(ValueError):
+            Pipeline('ABCD').strictly_n(3).to_list()
+        self.assertEqual(Pipeline(count()).time_limited(0).to_list(), [])
+        self.assertEqual(Pipeline([1, 2, 3]).time_limited(5).to_list(), [1, 2, 3])
+        self.assertEqual(Pipeline([1, 2, 3]).split_into([1, None]).time_limited(5).to_list(), [[1], [2, 3]])
+
+    def test_terminals(self):
+        pipeline = Pipeline(count(), batch_size=8).filter(_is_odd)
+        self.assertEqual(pipeline.first(), 1)
+        self.assertEqual(Pipeline(range(5)).map(_double).last(), 8)
+        self.assertEqual(Pipeline([]).first('x'), 'x')
+        self.assertEqual(Pipeline([3]).map(_double).one(), 6)
+
+    def test_explain(self):
+        pipeline = Pipeline(range(5), batch_size=16).map(_double).map_if(_is_odd, str).split_after(_is_odd)
+        self.assertEqual(pipeline.explain(), '\n'.join([
+            'source: range',
+            'fused[batch_size=16]: map(_double) -> map_if(_is_odd, str, _identity)',
+            'split_after(_is_odd, -1)',
+        ]))
+        self.assertEqual(Pipeline([]).map(_double).chunked(4).explain(), '\n'.join([
+            'source: list',
+            'fused[batch_size=4]: map(_double) -> chunked(4, False)',
+        ]))
+
+    def test_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            Pipeline([], batch_size=0)
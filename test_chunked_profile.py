@@ -0,0 +1,125 @@
+import json
+import os
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import chunked
+import chunked_profile
+
+
+def _slow_source(n):
+    for i in range(n):
+        sum(range(2000))
+        yield i
+
+
+class ProfilingTests(TestCase):
+    def test_restores_originals(self):
+        original = chunked.chunked
+        with chunked_profile.profiling():
+            self.assertIsNot(chunked.chunked, original)
+            self.assertIs(chunked.chunked.__wrapped__, original)
+        self.assertIs(chunked.chunked, original)
+        self.assertIsNone(chunked_profile.active())
+
+    def test_results_unchanged(self):
+        with chunked_profile.profiling():
+            self.assertEqual(list(chunked.chunked(iter(range(7)), 3)), [[0, 1, 2], [3, 4, 5], [6]])
+            self.assertEqual(chunked.first(iter('abc')), 'a')
+            self.assertEqual(list(chunked.difference([1, 3, 6])), [1, 2, 3])
+            with self.assertRaises(ValueError):
+                chunked.one(iter([]))
+
+    def test_call_site_stats(self):
+        with chunked_profile.profiling() as profile:
+            for _ in range(2):
+                list(chunked.chunked(_slow_source(10), 4))
+        [stats] = [s for s in profile if s.function == 'chunked']
+        self.assertEqual(stats.calls, 2)
+        self.assertEqual(stats.items, 6)
+        self.assertTrue(stats.site.startswith(__file__))
+        self.assertGreater(stats.upstream_seconds, 0)
+        self.assertLessEqual(stats.upstream_seconds, stats.seconds)
+        self.assertEqual(dict(stats.chunk_sizes), {2: 2, 4: 4})
+        self.assertEqual(stats.chunk_size_sum, 20)
+
+    def test_separate_sites(self):
+        with chunked_profile.profiling() as profile:
+            list(chunked.split_after('a,b', lambda c: c == ','))
+            list(chunked.split_after('a,b', lambda c: c == ','))
+        self.assertEqual(len([s for s in profile if s.function == 'split_after']), 2)
+
+    def test_internal_calls_not_recorded(self):
+        with chunked_profile.profiling() as profile:
+            chunked.nth_or_last(iter(range(5)), 10)
+        self.assertEqual([s.function for s in profile], ['nth_or_last'])
+
+    def test_registered_iterator(self):
+        class Reader:
+            def __iter__(self):
+                return self
+
+            def __next__(self):
+                raise AssertionError('should not iterate')
+
+        chunked.register(chunked.last, Reader, lambda reader, default=None: 'reader')
+        with chunked_profile.profiling() as profile:
+            self.assertEqual(chunked.last(Reader()), 'reader')
+            self.assertEqual(chunked.last(iter(range(3))), 2)
+        self.assertNotIn('register', chunked_profile.profiled_names())
+        self.assertEqual([s.calls for s in profile], [1, 1])
+
+    def test_time_limited_attributes(self):
+        with chunked_profile.profiling() as profile:
+            iterable = chunked.time_limited(0, iter(range(10)))
+            self.assertEqual(list(iterable), [])
+            self.assertTrue(iterable.timed_out)
+        [stats] = list(profile)
+        self.assertEqual(stats.function, 'time_limited')
+
+    def test_enable_twice(self):
+        profile = chunked_profile.enable()
+        try:
+            with self.assertRaises(RuntimeError):
+                chunked_profile.enable()
+            with chunked_profile.profiling() as nested:
+                self.assertIs(nested, profile)
+            self.assertIs(chunked_profile.active(), profile)
+        finally:
+            self.assertIs(chunked_profile.disable(), profile)
+
+    def test_exports(self):
+        with chunked_profile.profiling() as profile:
+            list(chunked.chunked(range(5), 2))
+            list(chunked.map_if(range(3), bool, str))
+        [chunks, mapped] = json.loads(profile.to_json())
+        self.assertEqual(chunks['function'], 'chunked')
+        self.assertEqual(chunks['chunk_sizes'], {'1': 1, '2': 2})
+        self.assertEqual(mapped['items'], 3)
+        self.assertEqual(mapped['chunk_sizes'], {})
+
+        text = profile.to_prometheus()
+        labels = f'function="chunked",site="{chunks["site"]}"'
+        self.assertIn('# TYPE chunked_items_total counter', text)
+        self.assertIn(f'chunked_items_total{{{labels}}} 3', text)
+        self.assertIn(f'chunked_chunk_size_bucket{{{labels},le="1"}} 1', text)
+        self.assertIn(f'chunked_chunk_size_bucket{{{labels},le="2"}} 3', text)
+        self.assertIn(f'chunked_chunk_size_bucket{{{labels},le="+Inf"}} 3', text)
+        self.assertIn(f'chunked_chunk_size_sum{{{labels}}} 5', text)
+
+    def test_bucket_boundaries(self):
+        stats = chunked_profile.CallSiteStats('chunked', 'here')
+        for size in (0, 1, 2, 3, 8, 9, 16):
+            stats.record_chunk(size)
+        self.assertEqual(dict(stats.chunk_sizes), {0: 1, 1: 1, 2: 1, 4: 1, 8: 1, 16: 2})
+
+    def test_environment(self):
+        with TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'profile.prom')
+            env = dict(os.environ, CHUNKED_PROFILE='1', CHUNKED_PROFILE_OUTPUT=path)
+            code = 'import chunked; list(chunked.chunked(range(10), 5))'
+            subprocess.run([sys.executable, '-c', code], check=True, env=env, cwd=os.path.dirname(__file__))
+            with open(path) as f:
+                self.assertIn('chunked_calls_total{function="chunked",site="<string>:1"} 1', f.read())
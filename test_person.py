@@ -1,4 +1,7 @@
-from person import Person
+from person import Person, PersonTable
+import os
+import subprocess
+import sys
 import pytest
 import time
 
@@ -43,3 +46,71 @@ class TestPerson:
     def test_email(self, setup):
         assert self.p1.email() == 'samanamini@email.com'
         assert self.p2.email() == 'artinamini@email.com'
+
+
+class TestPersonSlots:
+    def test_no_dict(self):
+        p = Person('saman', 'amini')
+        assert not hasattr(p, '__dict__')
+        with pytest.raises(AttributeError):
+            p.age = 3
+
+    def test_import_is_quiet(self):
+        output = subprocess.run(
+            [sys.executable, '-c', 'import person'],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout
+        assert output == ''
+
+    def test_spaces_removed(self):
+        assert Person('mary ann', 'van dyke').email() == 'maryannvandyke@email.com'
+
+
+class TestPersonTable:
+    @pytest.fixture
+    def table(self):
+        return PersonTable(['saman', 'artin', 'mary ann'], ['amini', 'amini', 'van dyke'], cache=True)
+
+    def test_bulk_matches_person(self, table):
+        people = [Person(f, l) for f, l in zip(table.fnames, table.lnames)]
+        assert table.full_names() == [p.full_name() for p in people]
+        assert table.emails() == [p.email() for p in people]
+        assert PersonTable(table.fnames, table.lnames).emails() == table.emails()
+
+    def test_rows(self, table):
+        row = table[-1]
+        assert (row.fname, row.lname) == ('mary ann', 'van dyke')
+        assert row.full_name() == 'mary ann van dyke'
+        assert row.email() == 'maryannvandyke@email.com'
+        assert [r.email() for r in table] == table.emails()
+        assert row.to_person().email() == row.email()
+        with pytest.raises(IndexError):
+            table[3]
+
+    def test_slice(self, table):
+        rows = table[1:]
+        assert [r.fname for r in rows] == ['artin', 'mary ann']
+        assert [r.email() for r in table[::-2]] == ['maryannvandyke@email.com', 'samanamini@email.com']
+        rows[0].fname = 'sara'
+        assert table.fnames[1] == 'sara'
+        assert table[5:] == []
+
+    def test_cache_invalidation(self, table):
+        emails = table.emails()
+        assert table.emails() is emails
+        table[1].fname = 'sara'
+        assert table[1].email() == 'saraamini@email.com'
+        assert table.emails() == ['samanamini@email.com', 'saraamini@email.com', 'maryannvandyke@email.com']
+        table.update(0, lname='rad')
+        table.append('ali', 'reza')
+        assert table.full_names() == ['saman rad', 'sara amini', 'mary ann van dyke', 'ali reza']
+        assert table.emails()[-1] == 'alireza@email.com'
+
+    def test_from_people(self):
+        table = PersonTable.from_people([Person('saman', 'amini'), Person('artin', 'amini')])
+        assert len(table) == 2
+        assert table.emails() == ['samanamini@email.com', 'artinamini@email.com']
+
+    def test_mismatched_columns(self):
+        with pytest.raises(ValueError):
+            PersonTable(['saman'], [])
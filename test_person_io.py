@@ -0,0 +1,87 @@
+import csv
+import json
+
+import pytest
+
+from person import Person, PersonTable
+from person_io import Throughput, read_people, write_people
+
+
+def _names(people):
+    return [(p.fname, p.lname) for p in people]
+
+
+class TestReadPeople:
+    @pytest.fixture
+    def csv_path(self, tmp_path):
+        path = tmp_path / 'people.csv'
+        path.write_text('id,lname,fname\n1,amini,saman\n2,amini,artin\n3,van dyke,mary ann\n')
+        return path
+
+    def test_csv(self, csv_path):
+        people = list(read_people(csv_path))
+        assert all(isinstance(p, Person) for p in people)
+        assert _names(people) == [('saman', 'amini'), ('artin', 'amini'), ('mary ann', 'van dyke')]
+
+    def test_batches_and_stats(self, csv_path):
+        stats = Throughput()
+        batches = list(read_people(csv_path, batch_size=2, stats=stats))
+        assert [len(batch) for batch in batches] == [2, 1]
+        assert stats.rows == 3
+        assert stats.bytes == csv_path.stat().st_size
+        assert stats.rows_per_sec > 0
+
+    def test_jsonl(self, tmp_path):
+        path = tmp_path / 'people.data'
+        path.write_text('{"fname": "saman", "lname": "amini"}\n\n{"lname": "amini", "fname": "artin"}\n')
+        assert _names(read_people(path, format='jsonl')) == [('saman', 'amini'), ('artin', 'amini')]
+
+    def test_empty_csv(self, tmp_path):
+        path = tmp_path / 'empty.csv'
+        path.write_text('')
+        assert list(read_people(path)) == []
+
+    def test_errors(self, tmp_path):
+        path = tmp_path / 'bad.csv'
+        path.write_text('first,last\na,b\n')
+        with pytest.raises(ValueError, match='fname and lname'):
+            list(read_people(path))
+        with pytest.raises(ValueError):
+            read_people(tmp_path / 'people.txt')
+        with pytest.raises(ValueError):
+            read_people(path, format='xml')
+        with pytest.raises(ValueError):
+            read_people(path, batch_size=0)
+
+
+class TestWritePeople:
+    people = [Person('saman', 'amini'), Person('mary ann', 'van dyke')]
+
+    def test_csv(self, tmp_path):
+        path = tmp_path / 'out.csv'
+        stats = write_people(path, self.people, batch_size=1)
+        assert stats.rows == 2
+        assert stats.bytes == path.stat().st_size
+        with open(path, newline='') as f:
+            rows = list(csv.reader(f))
+        assert rows == [
+            ['fname', 'lname', 'full_name', 'email'],
+            ['saman', 'amini', 'saman amini', 'samanamini@email.com'],
+            ['mary ann', 'van dyke', 'mary ann van dyke', 'maryannvandyke@email.com'],
+        ]
+
+    def test_jsonl_columns(self, tmp_path):
+        path = tmp_path / 'out.jsonl'
+        write_people(path, PersonTable(['saman'], ['amini']), columns=('email',))
+        assert [json.loads(line) for line in path.read_text().splitlines()] == [{'email': 'samanamini@email.com'}]
+
+    def test_round_trip(self, tmp_path):
+        people = [Person(f'first {i}', f'last{i}') for i in range(1000)]
+        for name in ('people.csv', 'people.ndjson'):
+            path = tmp_path / name
+            write_people(path, iter(people), batch_size=64)
+            assert _names(read_people(path)) == _names(people)
+
+    def test_unknown_column(self, tmp_path):
+        with pytest.raises(ValueError, match='age'):
+            write_people(tmp_path / 'out.csv', self.people, columns=('fname', 'age'))